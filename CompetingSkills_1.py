@@ -1,96 +1,81 @@
-import os
-import ijson
+import numpy as np
 import pandas as pd
-import re
-from collections import defaultdict
-from datetime import datetime
-from itertools import combinations
 
-# === CONFIGURATION ===
-USE_TEST_FILE = True  # 🔁 Set to False to process all chunk files
-TEST_FILE = "Posts_chunk_1.json"  # ✅ The file to test with
-
-# === FOLDER PATH ===
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-
-# === Generate list of files to process ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-    print(f"🧪 TEST MODE: Using only {TEST_FILE}")
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-    print(f"🚀 FULL MODE: {len(chunk_files)} chunk files found")
-
-# === Full file paths
-chunk_paths = [os.path.join(chunk_folder, fname) for fname in chunk_files]
-
-
-# === Config ===
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-tag_dates = defaultdict(list)
-
-# === Stream all chunk files ===
-for full_path in chunk_paths:
-    file_name = os.path.basename(full_path)
-    if file_name.startswith("Posts_chunk_") and file_name.endswith(".json"):
-        full_path = os.path.join(chunk_folder, file_name)
-        print(f"📦 Processing {file_name}...")
-
-        try:
-            with open(full_path, "r", encoding="utf-8") as f:
-                for post in ijson.items(f, "item"):
-                    try:
-                        date_str = post.get("CreationDate", "")
-                        try:
-                            date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f")
-                        except ValueError:
-                            continue
+from correlation import standardize, iter_pairs_below, most_negative_pairs, SignLSH
+from tag_cube import open_cube, prepare_cube
+from tag_vocab import UNTAGGED_ID
 
-                        tag_str = post.get("Tags", "")
-                        tags = re.findall(r'\|([^|]+)\|', tag_str) if tag_str else []
-
-                        for tag in tags:
-                            tag_dates[tag].append(date)
-
-                    except Exception as e:
-                        print(f"⚠️ Skipped post due to error: {e}")
-                        continue
-
-        except Exception as e:
-            print(f"❌ Failed to read {file_name}: {e}")
-            continue
+# === CONFIGURATION ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
 
-# === Create Time Series (monthly counts) ===
-tag_series = {}
+# === Tag x month cube (scanned and built once, shared by all scripts) ===
+cube_dir = prepare_cube(SAMPLE_FRACTION)
+print(f"🚀 Using tag cube in {cube_dir}")
 
-for tag, dates in tag_dates.items():
-    s = pd.Series(1, index=pd.to_datetime(dates))
-    s = s.resample("ME").sum().fillna(0)
-    tag_series[tag] = s
+cube = open_cube(cube_dir)
+vocab = cube.vocab
 
-# === Create aligned DataFrame of all tag time series ===
-all_tags_df = pd.DataFrame(tag_series).fillna(0)
+# === Create Time Series (monthly counts over the observed months) ===
+posts = cube["posts"]
+active = np.flatnonzero(posts.sum(axis=0))
+counts = posts[:, active[0]:active[-1] + 1]
 
-# === Compute Pearson Correlations ===
-competing_skills = []
+# === Tag x month matrix (rows are tag ids; names only resolved when the results are written) ===
+tag_ids = np.arange(cube.n_tags)
+tag_ids = tag_ids[tag_ids != UNTAGGED_ID]
 
+# === Compute Pearson Correlations (tiled matrix products over standardized rows) ===
 min_total_posts = 100
-filtered_tags = [tag for tag in all_tags_df.columns if all_tags_df[tag].sum() >= min_total_posts]
-print(f"✅ Tags retained: {len(filtered_tags)}")
+correlation_threshold = -0.5
+top_k = None  # e.g. 1000 to keep only the most negative pairs instead of every pair below the threshold
+use_lsh = False  # True: approximate LSH search (exact r, some pairs missed) for the whole tag universe (lower min_total_posts too)
 
-for tag1, tag2 in combinations(filtered_tags, 2):
-    r = all_tags_df[tag1].corr(all_tags_df[tag2])
-    if r < -0.5:
-        competing_skills.append((tag1, tag2, round(r, 3)))
+# Raw cube counts are a sample: scale the totals up before the absolute threshold
+filtered_tags = tag_ids[counts[tag_ids].sum(axis=1) / cube.sample_fraction >= min_total_posts]
+print(f"✅ Tags retained: {len(filtered_tags)}")
+z = standardize(counts[filtered_tags])
 
 print(f"📊 Tags to analyze after filtering: {len(filtered_tags)}")
 print(f"🔁 Estimated comparisons: {len(filtered_tags) * (len(filtered_tags)-1) // 2}")
 
-# === Save to CSV ===
-result_df = pd.DataFrame(competing_skills, columns=["Skill_A", "Skill_B", "Correlation"])
-result_df.to_csv("competing_skills_negative_corr.csv", index=False)
-
-print("✅ Done! Found competing skills with R < -0.5. Output saved to 'competing_skills_negative_corr.csv'")
+# === Stream pairs to CSV strip by strip (names resolved per strip) ===
+# LSH results are approximate and go to their own file, never over the exact table
+output_path = "competing_skills_negative_corr_lsh.csv" if use_lsh else "competing_skills_negative_corr.csv"
+
+
+def write_pairs(i, j, r, mode="a"):
+    pd.DataFrame({
+        "Skill_A": vocab.names(filtered_tags[i]),
+        "Skill_B": vocab.names(filtered_tags[j]),
+        "Correlation": np.round(r, 3),
+    }).to_csv(output_path, mode=mode, header=(mode == "w"), index=False)
+
+
+write_pairs([], [], [], mode="w")
+if use_lsh:
+    # Bits and tables sized so a pair right at the threshold is found with probability >= 95%
+    index = SignLSH(z, threshold=correlation_threshold)
+    i, j, r = index.pairs_below(correlation_threshold)
+    write_pairs(i, j, r)
+    found = len(i)
+    print(f"🎯 Approximate (LSH, {index.n_tables} tables x {index.n_bits} bits): "
+          f"expected recall {index.recall(correlation_threshold):.1%} at R = {correlation_threshold}, "
+          f"{index.recall(-0.8):.1%} at R = -0.8")
+    if index.skipped_pairs:
+        print(f"⚠️ {index.skipped_pairs} candidate pairs in oversized buckets were skipped")
+elif top_k is None:
+    found = 0
+    for i, j, r in iter_pairs_below(z, correlation_threshold):
+        write_pairs(i, j, r)
+        found += len(i)
+else:
+    i, j, r = most_negative_pairs(z, top_k)
+    write_pairs(i, j, r)
+    found = len(i)
+
+if use_lsh:
+    print(f"✅ Done! Found {found} competing skill pairs with R < {correlation_threshold} (approximate). Output saved to '{output_path}'")
+elif top_k is None:
+    print(f"✅ Done! Found {found} competing skill pairs with R < {correlation_threshold}. Output saved to '{output_path}'")
+else:
+    print(f"✅ Done! Kept the {found} most negatively correlated skill pairs (top {top_k}). Output saved to '{output_path}'")
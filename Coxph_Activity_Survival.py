@@ -1,57 +1,30 @@
-import os
-import ijson
-import re
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from collections import defaultdict
-from datetime import datetime
 from lifelines import CoxPHFitter
 
+from tag_cube import open_cube, prepare_cube
+from tag_vocab import UNTAGGED_ID
+
 # === CONFIGURATION ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
 cutoff_date = pd.Timestamp("2024-01-01")
 death_gap_months = 12
 
-# === Load files ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
+# === Tag x month cube (scanned and built once, shared by all scripts) ===
+cube_dir = prepare_cube(SAMPLE_FRACTION)
 
-# === Extract tags ===
-def extract_tags(tag_str):
-    return re.findall(r'\|([^|]+)\|', tag_str) if isinstance(tag_str, str) else []
+cube = open_cube(cube_dir)
+vocab = cube.vocab
 
-# === Build monthly tag series ===
-tag_series = defaultdict(lambda: pd.Series(dtype=int))
+# === Monthly tag series (keyed by tag id) ===
 timeline = pd.date_range("2008-01-01", "2024-12-01", freq="MS")
-
-for path in chunk_paths:
-    print(f"📦 Reading {os.path.basename(path)}")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date = datetime.strptime(post["CreationDate"], "%Y-%m-%dT%H:%M:%S.%f")
-                    month = pd.Timestamp(date).replace(day=1)
-                    tags = extract_tags(post.get("Tags", ""))
-                    for tag in tags:
-                        tag_series[tag][month] = tag_series[tag].get(month, 0) + 1
-                except Exception:
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {path}: {e}")
-        continue
-
-# === Normalize series to full timeline ===
-for tag in tag_series:
-    tag_series[tag] = tag_series[tag].reindex(timeline, fill_value=0)
+counts = cube.matrix("posts", timeline)
+tag_series = {
+    tag_id: pd.Series(counts[tag_id], index=timeline)
+    for tag_id in np.flatnonzero(counts.sum(axis=1))
+    if tag_id != UNTAGGED_ID
+}
 
 # === Compute survival table ===
 survival_data = []
@@ -74,7 +47,7 @@ for skill, series in tag_series.items():
     peak_monthly = series.max()
 
     survival_data.append({
-        "Skill": skill,
+        "Skill": vocab.name(skill),
         "Duration": duration,
         "Event": is_dead,
         "AvgMonthlyPosts": avg_monthly,
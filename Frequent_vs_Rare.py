@@ -1,67 +1,19 @@
-import os
-import ijson
-import pandas as pd
-from datetime import datetime
-from lifelines import KaplanMeierFitter
 from lifelines.statistics import logrank_test
-import re
 import matplotlib.pyplot as plt
 
-# === CONFIGURATION ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-
-# === Load chunk paths ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Helper: extract tags ===
-def extract_tags(tag_str):
-    return re.findall(r'\|([^|]+)\|', tag_str) if isinstance(tag_str, str) else []
-
-# === Step 1: Stream & build (date, tag) rows ===
-tag_occurrences = []
+from post_scan import SHARD_DIR, ensure_post_tags
+from survival import grouped_estimates, plot_estimates, survival_dataset
 
-for path in chunk_paths:
-    print(f"📦 Reading {os.path.basename(path)}...")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date = datetime.strptime(post["CreationDate"], "%Y-%m-%dT%H:%M:%S.%f")
-                    tags = extract_tags(post.get("Tags", ""))
-                    for tag in tags:
-                        tag_occurrences.append((date, tag))
-                except Exception:
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {path}: {e}")
-        continue
-
-# === Step 2: Build exploded DataFrame ===
-df = pd.DataFrame(tag_occurrences, columns=["date", "skill"])
+# === CONFIGURATION ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
 
-# === Step 3: Compute skill lifespan ===
-skill_lifespan = df.groupby('skill').agg(
-    first_seen=('date', 'min'),
-    last_seen=('date', 'max'),
-    count=('date', 'count')
-).reset_index()
+# === Post-tag table (scanned once, shared by all scripts) ===
+table_dir = ensure_post_tags(SHARD_DIR, sample_fraction=SAMPLE_FRACTION)
 
-# === Step 4: Compute death status ===
-max_date = df['date'].max()
-cutoff_date = max_date - pd.DateOffset(months=12)
-skill_lifespan['dead'] = skill_lifespan['last_seen'] < cutoff_date
+# === Step 1–4: Skill lifespans from the shared survival dataset (see survival.py) ===
+skill_lifespan = survival_dataset(table_dir, death_gap_months=12)
 
 # === Step 5: Duration (days) ===
-skill_lifespan['duration'] = (skill_lifespan['last_seen'] - skill_lifespan['first_seen']).dt.days
 skill_lifespan['duration'] = skill_lifespan['duration'].clip(lower=1)
 
 # === Step 6: Categorize frequency groups ===
@@ -78,12 +30,12 @@ def assign_group(cnt):
 
 skill_lifespan['group'] = skill_lifespan['count'].apply(assign_group)
 
-# === Step 7: Plot KM survival curves for Rare vs Frequent ===
+# === Step 7: Plot KM survival curves for Rare vs Frequent (all groups estimated in one pass) ===
+curves = grouped_estimates(skill_lifespan['duration'], skill_lifespan['dead'], skill_lifespan['group'])
+curves.to_csv("km_survival_by_frequency_group.csv", index=False)
+
 plt.figure(figsize=(10, 6))
-for label, df_group in skill_lifespan[skill_lifespan['group'].isin(['Rare', 'Frequent'])].groupby('group'):
-    kmf = KaplanMeierFitter()
-    kmf.fit(df_group['duration'], event_observed=df_group['dead'], label=label)
-    kmf.plot_survival_function(ci_show=False)
+plot_estimates(curves, groups=['Frequent', 'Rare'])
 
 plt.title('Skill Survival: Frequent vs Rare')
 plt.xlabel('Days since first appearance')
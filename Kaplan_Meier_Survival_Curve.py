@@ -1,64 +1,35 @@
-import os
-import ijson
-import re
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-from collections import defaultdict
-from datetime import datetime
 from lifelines import KaplanMeierFitter
 
+from tag_cube import open_cube, prepare_cube
+from tag_vocab import UNTAGGED_ID
+
 # === CONFIGURATION ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
 
 # === Survival Parameters ===
 cutoff_date = pd.Timestamp("2024-01-01")
 death_gap_months = 12
 
-# === Load chunk files ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-    print(f"🧪 TEST MODE: Using {TEST_FILE}")
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-    print(f"🚀 FULL MODE: {len(chunk_files)} files")
-
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Collect tag usage dates ===
-tag_dates = defaultdict(list)
-
-def extract_tags(tag_str):
-    return re.findall(r'\|([^|]+)\|', tag_str) if isinstance(tag_str, str) else []
-
-for path in chunk_paths:
-    print(f"📦 Reading {os.path.basename(path)}...")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date = datetime.strptime(post["CreationDate"], "%Y-%m-%dT%H:%M:%S.%f")
-                    tags = extract_tags(post.get("Tags", ""))
-                    for tag in tags:
-                        tag_dates[tag].append(date)
-                except Exception:
-                    continue
-    except Exception as e:
-        print(f"❌ Error in {path}: {e}")
-        continue
+# === Tag x month cube (scanned and built once, shared by all scripts) ===
+cube_dir = prepare_cube(SAMPLE_FRACTION)
+print(f"🚀 Using tag cube in {cube_dir}")
+
+cube = open_cube(cube_dir)
+vocab = cube.vocab
 
 # === Build monthly time series per tag ===
 tag_series = {}
 timeline = pd.date_range(start="2008-01-01", end="2024-12-01", freq="MS")
+counts = cube.matrix("posts", timeline)
 
-for tag, dates in tag_dates.items():
-    s = pd.Series(1, index=pd.to_datetime(dates))
-    s = s.resample("M").sum().reindex(timeline, fill_value=0)
-    tag_series[tag] = s
+# Keyed by tag id; names are only resolved when the results are written
+for tag_id in np.flatnonzero(counts.sum(axis=1)):
+    if tag_id == UNTAGGED_ID:
+        continue
+    tag_series[tag_id] = pd.Series(counts[tag_id], index=timeline)
 
 # === Compute survival data ===
 survival_data = []
@@ -80,7 +51,7 @@ for skill, series in tag_series.items():
     is_dead = 1 if months_inactive >= death_gap_months else 0
 
     survival_data.append({
-        "Skill": skill,
+        "Skill": vocab.name(skill),
         "Duration": duration,
         "Event": is_dead
     })
@@ -1,102 +1,80 @@
-import os
-import ijson
-import pandas as pd
-import re
 import matplotlib.pyplot as plt
-from datetime import datetime
 from lifelines import KaplanMeierFitter, NelsonAalenFitter, WeibullFitter
 
-# === CONFIGURATION ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-
-# === Load chunk paths ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Helper: extract tags ===
-def extract_tags(tag_str):
-    return re.findall(r'\|([^|]+)\|', tag_str) if isinstance(tag_str, str) else []
+from chunk_runner import WORKERS
+from post_scan import SHARD_DIR, ensure_post_tags
+from survival import survival_dataset
+from survival_bootstrap import bootstrap_survival
 
-# === Stream and collect tag usage ===
-tag_occurrences = []
-
-for path in chunk_paths:
-    print(f"📦 Reading {os.path.basename(path)}...")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date = datetime.strptime(post["CreationDate"], "%Y-%m-%dT%H:%M:%S.%f")
-                    tags = extract_tags(post.get("Tags", ""))
-                    for tag in tags:
-                        tag_occurrences.append((date, tag))
-                except:
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {path}: {e}")
-        continue
+# === CONFIGURATION ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
+replicates = 2000      # bootstrap resamples of the skills (fixed seeds)
+workers = WORKERS      # worker processes for the bootstrap
 
-# === Create DataFrame ===
-df = pd.DataFrame(tag_occurrences, columns=["date", "skill"])
+if __name__ == "__main__":
+    # === Post-tag table (scanned once, shared by all scripts) ===
+    table_dir = ensure_post_tags(SHARD_DIR, sample_fraction=SAMPLE_FRACTION)
 
-# === Compute skill lifespan ===
-skill_lifespan = df.groupby('skill').agg(
-    first_seen=('date', 'min'),
-    last_seen=('date', 'max'),
-    count=('date', 'count')
-).reset_index()
+    # === Skill lifespans from the shared survival dataset (see survival.py) ===
+    skill_lifespan = survival_dataset(table_dir, death_gap_months=12)
+    skill_lifespan['duration'] = skill_lifespan['duration'].clip(lower=1)
 
-# === Determine death and duration ===
-max_date = df['date'].max()
-cutoff_date = max_date - pd.DateOffset(months=12)
-skill_lifespan['dead'] = skill_lifespan['last_seen'] < cutoff_date
-skill_lifespan['duration'] = (skill_lifespan['last_seen'] - skill_lifespan['first_seen']).dt.days.clip(lower=1)
+    # === Survival analysis input ===
+    T = skill_lifespan['duration']
+    E = skill_lifespan['dead']
 
-# === Survival analysis input ===
-T = skill_lifespan['duration']
-E = skill_lifespan['dead']
+    # === Fit models ===
+    kmf = KaplanMeierFitter()
+    naf = NelsonAalenFitter()
+    wf = WeibullFitter()
 
-# === Fit models ===
-kmf = KaplanMeierFitter()
-naf = NelsonAalenFitter()
-wf = WeibullFitter()
+    kmf.fit(T, event_observed=E, label='Kaplan-Meier')
+    naf.fit(T, event_observed=E, label='Nelson-Aalen')
+    wf.fit(T, event_observed=E)
 
-kmf.fit(T, event_observed=E, label='Kaplan-Meier')
-naf.fit(T, event_observed=E, label='Nelson-Aalen')
-wf.fit(T, event_observed=E)
+    # === Bootstrap percentile bands (heavy censoring makes the asymptotic CIs unreliable) ===
+    print(f"🎲 Bootstrapping {replicates} resamples of {len(T)} skills on {workers} workers...")
+    bands, estimates = bootstrap_survival(T, E, replicates=replicates, workers=workers)
+    bands.to_csv("skill_survival_bootstrap_bands.csv")
+    estimates.to_csv("skill_survival_bootstrap_estimates.csv")
+    lower, upper = [c for c in bands.columns if c.startswith("KM_estimate_")]
+    w_lower, w_upper = [c for c in bands.columns if c.startswith("Weibull_estimate_")]
 
-# === Plot survival curves ===
-plt.figure(figsize=(10, 6))
-kmf.plot_survival_function(ci_show=True)
-wf.plot_survival_function(ci_show=True)
-plt.title('Skill Survival Curve (Kaplan-Meier & Weibull)')
-plt.xlabel('Days since first appearance')
-plt.ylabel('Survival Probability')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("skill_survival_km_weibull.png")
-plt.show()
+    # === Plot survival curves ===
+    plt.figure(figsize=(10, 6))
+    kmf.plot_survival_function(ci_show=False)
+    plt.fill_between(bands.index, bands[lower], bands[upper], step="post", alpha=0.25,
+                     label='Kaplan-Meier (bootstrap 95%)')
+    wf.plot_survival_function(ci_show=False)
+    plt.fill_between(bands.index, bands[w_lower], bands[w_upper], alpha=0.25,
+                     label='Weibull (bootstrap 95%)')
+    plt.title('Skill Survival Curve (Kaplan-Meier & Weibull)')
+    plt.xlabel('Days since first appearance')
+    plt.ylabel('Survival Probability')
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig("skill_survival_km_weibull.png")
+    plt.show()
 
-# === Plot hazard curve ===
-plt.figure(figsize=(10, 6))
-naf.plot_cumulative_hazard()
-plt.title('Cumulative Hazard (Nelson-Aalen Estimator)')
-plt.xlabel('Days since first appearance')
-plt.ylabel('Cumulative Hazard')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("skill_hazard_nelson_aalen.png")
-plt.show()
+    # === Plot hazard curve ===
+    plt.figure(figsize=(10, 6))
+    naf.plot_cumulative_hazard()
+    plt.title('Cumulative Hazard (Nelson-Aalen Estimator)')
+    plt.xlabel('Days since first appearance')
+    plt.ylabel('Cumulative Hazard')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig("skill_hazard_nelson_aalen.png")
+    plt.show()
 
-# === Print Weibull parameters ===
-print("\nWeibull Model Parameters:")
-print(f"  λ (scale): {wf.lambda_:.2f}")
-print(f"  ρ (shape): {wf.rho_:.2f}")
+    # === Print Weibull parameters ===
+    est_lower, est_upper = estimates.columns[1], estimates.columns[2]
+    print("\nWeibull Model Parameters:")
+    print(f"  λ (scale): {wf.lambda_:.2f}  "
+          f"[bootstrap 95%: {estimates.loc['lambda', est_lower]:.2f} – {estimates.loc['lambda', est_upper]:.2f}]")
+    print(f"  ρ (shape): {wf.rho_:.2f}  "
+          f"[bootstrap 95%: {estimates.loc['rho', est_lower]:.2f} – {estimates.loc['rho', est_upper]:.2f}]")
+    print(f"  Median lifetime (KM): {estimates.loc['median lifetime', 'estimate']:.0f} days  "
+          f"[bootstrap 95%: {estimates.loc['median lifetime', est_lower]:.0f} – "
+          f"{estimates.loc['median lifetime', est_upper]:.0f}]")
@@ -1,13 +1,13 @@
+from post_shards import shard_posts_json
+
 input_file = "C:/Users/makri/Desktop/SKILL AGEING/Posts.json"
-lines_per_file = 1000000
-file_num = 1
+output_folder = "C:/Users/makri/Desktop/SKILL AGEING/Posts_shards"
+target_bytes = 256 * 1024 * 1024  # ~256 MB per shard
+
+# Every shard is valid newline-delimited JSON and gets a .idx offset sidecar;
+# Posts_manifest.json records rows and min/max CreationDate per shard
+manifest = shard_posts_json(input_file, output_folder, target_bytes)
 
-with open(input_file, 'r', encoding='utf-8') as infile:
-    while True:
-        lines = list(infile.readline() for _ in range(lines_per_file))
-        if not lines or lines[0] == '':
-            break
-        with open(f"Posts_chunk_{file_num}.json", 'w', encoding='utf-8') as chunk:
-            chunk.writelines(lines)
-        file_num += 1
-        print(f"Created chunk: Posts_chunk_{file_num - 1}.json")
\ No newline at end of file
+for shard in manifest["shards"]:
+    print(f"Created shard: {shard['file']} ({shard['rows']} posts, {shard['min_date']} → {shard['max_date']})")
+print(f"✅ {manifest['rows']} posts written to {len(manifest['shards'])} shards")
@@ -1,27 +1,141 @@
 import xml.etree.ElementTree as ET
 import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 
 def xml_to_single_json(xml_path, json_path):
     with open(json_path, 'w', encoding='utf-8') as json_file:
         json_file.write('[\n')  # Start of JSON array
 
-        context = ET.iterparse(xml_path, events=('start',))
+        context = ET.iterparse(xml_path, events=('start', 'end'))
+        _, root = next(context)  # <posts> element, cleared as we go
         first = True
         count = 0
 
         for event, elem in context:
-            if elem.tag == 'row':
+            if event == 'end' and elem.tag == 'row':
                 if not first:
                     json_file.write(',\n')
                 json.dump(elem.attrib, json_file)
-                elem.clear()
+                root.clear()  # drop finished rows so memory stays flat
                 first = False
                 count += 1
 
         json_file.write('\n]')  # End of JSON array
     print(f'✅ Completed: {count} items written to {json_path}')
 
-# Usage
-xml_to_single_json('Posts.xml', 'Posts.json')
 
+# === Parallel converter: byte ranges split at <row boundaries ===
+ROW_START = b'<row'
+PART_BYTES = 256 * 1024 * 1024  # target size of one byte range
+
+
+def _next_row_offset(f, offset, file_size):
+    # First line at or after `offset` that opens a <row element
+    if offset == 0:
+        f.seek(0)
+    else:
+        f.seek(offset - 1)
+        f.readline()  # finish the line we landed in
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        if not line:
+            return file_size
+        if line.lstrip().startswith(ROW_START):
+            return pos
+
+
+def find_row_boundaries(xml_path, n_parts):
+    file_size = os.path.getsize(xml_path)
+    boundaries = []
+    with open(xml_path, 'rb') as f:
+        for i in range(n_parts):
+            pos = _next_row_offset(f, file_size * i // n_parts, file_size)
+            if not boundaries or pos > boundaries[-1]:
+                boundaries.append(pos)
+    if boundaries[-1] < file_size:
+        boundaries.append(file_size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def convert_range(xml_path, start, end, out_path):
+    offsets = [0]  # record offsets, same .idx sidecar as post_shards.py
+    min_date = max_date = None
+    pending = b''
+
+    with open(xml_path, 'rb') as f, open(out_path, 'wb') as out:
+        f.seek(start)
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            line = pending + line.strip()
+            if not line.startswith(ROW_START):
+                continue  # <posts>, </posts>, xml header
+            if not line.endswith(b'/>'):
+                pending = line + b' '  # row spread over several lines
+                continue
+            pending = b''
+
+            attrib = ET.fromstring(line).attrib
+            record = json.dumps(attrib).encode('utf-8') + b'\n'
+            out.write(record)
+            offsets.append(offsets[-1] + len(record))
+
+            date = attrib.get('CreationDate')
+            if date:
+                if min_date is None or date < min_date:
+                    min_date = date
+                if max_date is None or date > max_date:
+                    max_date = date
 
+    with open(out_path + '.idx', 'wb') as idx:
+        array('q', offsets).tofile(idx)
+
+    return {
+        'file': os.path.basename(out_path),
+        'rows': len(offsets) - 1,
+        'min_date': min_date,
+        'max_date': max_date,
+        'bytes': offsets[-1],
+    }
+
+
+def xml_to_sharded_json(xml_path, out_dir, workers=None, part_bytes=PART_BYTES):
+    workers = workers or os.cpu_count()
+    os.makedirs(out_dir, exist_ok=True)
+
+    n_parts = max(workers, -(-os.path.getsize(xml_path) // part_bytes))
+    ranges = find_row_boundaries(xml_path, n_parts)
+    print(f'📦 Splitting {xml_path} into {len(ranges)} byte ranges on {workers} workers')
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(convert_range, xml_path, start, end,
+                        os.path.join(out_dir, f'Posts_shard_{i:05d}.ndjson'))
+            for i, (start, end) in enumerate(ranges, start=1)
+        ]
+        shards = []
+        for future in futures:
+            shard = future.result()
+            print(f"✅ {shard['file']}: {shard['rows']} rows ({shard['min_date']} → {shard['max_date']})")
+            shards.append(shard)
+
+    manifest = {
+        'source': os.path.basename(xml_path),
+        'rows': sum(s['rows'] for s in shards),
+        'shards': shards,
+    }
+    manifest_path = os.path.join(out_dir, 'Posts_manifest.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"✅ Completed: {manifest['rows']} rows in {len(shards)} shards, manifest at {manifest_path}")
+    return manifest
+
+
+# Usage
+if __name__ == '__main__':
+    xml_to_sharded_json('Posts.xml', 'Posts_shards')
@@ -1,15 +1,11 @@
-import os
-import ijson
 import pandas as pd
 import numpy as np
-import re
-from collections import defaultdict
-from datetime import datetime
+
+from tag_cube import open_cube, prepare_cube
+from tag_vocab import UNTAGGED_ID
 
 # === CONFIGURATION ===
-USE_TEST_FILE = False
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
 
 # === PARAMETERS ===
 drop_threshold = 0.5        # 50% drop
@@ -17,57 +13,23 @@ drop_window = 6             # months
 min_peak_value = 10         # peak usage must be at least this to be considered real
 min_total_months = 24       # avoid short-lived tags
 
-# === File list ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-    print(f"🧪 TEST MODE: Using only {TEST_FILE}")
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-    print(f"🚀 FULL MODE: {len(chunk_files)} chunk files found")
-
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Parse and collect tag dates ===
-tag_dates = defaultdict(list)
-
-for full_path in chunk_paths:
-    file_name = os.path.basename(full_path)
-    print(f"\n📦 Processing {file_name}...")
-
-    try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date_str = post.get("CreationDate", "")
-                    try:
-                        date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f")
-                    except ValueError:
-                        continue
-
-                    tag_str = post.get("Tags", "")
-                    tags = re.findall(r'\|([^|]+)\|', tag_str) if tag_str else []
-
-                    for tag in tags:
-                        tag_dates[tag].append(date)
-
-                except Exception as e:
-                    print(f"⚠️ Skipped post: {e}")
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {file_name}: {e}")
-        continue
+# === Tag x month cube (scanned and built once, shared by all scripts) ===
+cube_dir = prepare_cube(SAMPLE_FRACTION)
+print(f"🚀 Using tag cube in {cube_dir}")
+
+cube = open_cube(cube_dir)
+vocab = cube.vocab
 
 # === Build monthly time series per tag ===
 tag_series = {}
 timeline = pd.date_range(start="2008-01-01", end="2024-12-31", freq="M")
+counts = cube.matrix("posts", timeline)
 
-for tag, dates in tag_dates.items():
-    s = pd.Series(1, index=pd.to_datetime(dates))
-    s = s.resample("M").sum().reindex(timeline, fill_value=0)
-    tag_series[tag] = s
+# Keyed by tag id; names are only resolved when the results are written
+for tag_id in np.flatnonzero(counts.sum(axis=1)):
+    if tag_id == UNTAGGED_ID:
+        continue
+    tag_series[tag_id] = pd.Series(counts[tag_id], index=timeline)
 
 # === Detect Rapid Obsolescence ===
 rapid_drops = []
@@ -98,7 +60,7 @@ for tag, series in tag_series.items():
 
     if drop_ratio >= drop_threshold:
         rapid_drops.append({
-            "Skill": tag,
+            "Skill": vocab.name(tag),
             "Peak Month": peak_index.strftime("%Y-%m"),
             "Peak Value": int(peak_value),
             "Min Value After Peak": int(min_val_after_peak),
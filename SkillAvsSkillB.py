@@ -1,65 +1,29 @@
-import os
-import ijson
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import re
-from collections import defaultdict
-from datetime import datetime
 
-# === CONFIG ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-
-# === File list ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-    print(f"🧪 TEST MODE: Using only {TEST_FILE}")
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-    print(f"🚀 FULL MODE: {len(chunk_files)} chunk files found")
-
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Parse dates and tags ===
-tag_dates = defaultdict(list)
-
-for full_path in chunk_paths:
-    file_name = os.path.basename(full_path)
-    print(f"\n📦 Processing {file_name}...")
-
-    try:
-        with open(full_path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    date_str = post.get("CreationDate", "")
-                    try:
-                        date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f")
-                    except ValueError:
-                        continue
+from correlation import LaggedSeries
+from tag_cube import open_cube, prepare_cube
+from tag_vocab import UNTAGGED_ID
 
-                    tag_str = post.get("Tags", "")
-                    tags = re.findall(r'\|([^|]+)\|', tag_str) if tag_str else []
+# === CONFIG ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
+top_n_tags = 3000      # lag scan over the most posted tags
+max_lag = 36           # months, in both directions
+lag_threshold = -0.5   # keep pairs whose best lagged correlation is below this
 
-                    for tag in tags:
-                        tag_dates[tag].append(date)
+# === Tag x month cube (scanned and built once, shared by all scripts) ===
+cube_dir = prepare_cube(SAMPLE_FRACTION)
+print(f"🚀 Using tag cube in {cube_dir}")
 
-                except Exception as e:
-                    print(f"⚠️ Skipped post: {e}")
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {file_name}: {e}")
-        continue
+cube = open_cube(cube_dir)
+vocab = cube.vocab
 
-# === Build monthly time series per tag ===
-tag_series = {}
-for tag, dates in tag_dates.items():
-    s = pd.Series(1, index=pd.to_datetime(dates))
-    s = s.resample("M").sum().fillna(0)
-    tag_series[tag] = s
+# === Monthly time series over the observed months ===
+posts = cube["posts"]
+active = np.flatnonzero(posts.sum(axis=0))
+counts = posts[:, active[0]:active[-1] + 1]
+timeline = cube.months[active[0]:active[-1] + 1].to_timestamp(how="end").normalize()
 
 # === Pairs to plot ===
 skill_pairs = [
@@ -71,23 +35,49 @@ skill_pairs = [
     ("open-source", "rest"),
 ]
 
+# === Lagged cross-correlation scan over the top tags ===
+totals = np.asarray(counts.sum(axis=1))
+totals[UNTAGGED_ID] = 0
+top_tags = np.sort(np.argsort(-totals, kind="stable")[:top_n_tags])
+top_tags = top_tags[totals[top_tags] > 0]
+lagged = LaggedSeries(counts[top_tags], max_lag)
+
+output_path = "lagged_competing_skills.csv"
+results = []
+for i, j, lag, r, r0 in lagged.iter_best_lags(lag_threshold):
+    results.append(pd.DataFrame({
+        "Skill_A": vocab.names(top_tags[i]),
+        "Skill_B": vocab.names(top_tags[j]),
+        "Best Lag (months)": lag,  # > 0: Skill_B follows Skill_A by this many months
+        "Lagged Correlation": np.round(r, 3),
+        "Correlation at Lag 0": np.round(r0, 3),
+    }))
+lag_df = pd.concat(results, ignore_index=True) if results else pd.DataFrame(
+    columns=["Skill_A", "Skill_B", "Best Lag (months)", "Lagged Correlation", "Correlation at Lag 0"])
+lag_df.to_csv(output_path, index=False)
+print(f"⏱ {len(lag_df)} pairs with lagged r < {lag_threshold} (±{lagged.max_lag} months) saved to '{output_path}'")
+
 # === Plotting ===
 for skill_a, skill_b in skill_pairs:
-    if skill_a not in tag_series or skill_b not in tag_series:
+    id_a, id_b = vocab.lookup(skill_a), vocab.lookup(skill_b)
+    if id_a < 0 or id_b < 0 or totals[id_a] == 0 or totals[id_b] == 0:
         print(f"⚠️ Skipping: {skill_a} & {skill_b} not found in data")
         continue
 
-    df = pd.DataFrame({
-        skill_a: tag_series[skill_a],
-        skill_b: tag_series[skill_b]
-    }).fillna(0)
-
+    df = pd.DataFrame({skill_a: counts[id_a], skill_b: counts[id_b]}, index=timeline)
     df_norm = df / df.max()
 
+    pair = LaggedSeries(counts[[id_a, id_b]], max_lag)
+    lag, r = pair.best(pair.correlations([0], [1])[0])
+    if lag is None:
+        print(f"⚠️ Skipping: {skill_a} & {skill_b} have no lag with a defined correlation (constant series)")
+        continue
+
     plt.figure(figsize=(12, 5))
     plt.plot(df_norm.index, df_norm[skill_a], label=skill_a, linewidth=2)
     plt.plot(df_norm.index, df_norm[skill_b], label=skill_b, linewidth=2)
-    plt.title(f"Competing Skill Trends: {skill_a} vs {skill_b}", fontsize=14)
+    plt.title(f"Competing Skill Trends: {skill_a} vs {skill_b} (best lag {lag:+d} months, r = {r:.2f})",
+              fontsize=14)
     plt.xlabel("Date")
     plt.ylabel("Normalized Frequency")
     plt.legend()
@@ -0,0 +1,49 @@
+import pandas as pd
+import numpy as np
+
+from chunk_runner import WORKERS
+from contagion import contagion_table
+from cooccurrence import load_cooccurrence
+from post_scan import SHARD_DIR, ensure_post_tags
+from survival import survival_dataset
+
+# === CONFIGURATION ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
+model = "SIR"          # "SIS" lets dying skills revive
+runs = 2000            # stochastic trajectories
+months = 60            # simulated horizon
+beta = 0.5             # transmission rate per month at full exposure to dying co-tags
+gamma = 0.1            # SIR: dying -> dead, SIS: dying -> revived, per month
+workers = WORKERS      # worker processes for the trajectories
+output_path = "skill_contagion_simulation.csv"
+
+if __name__ == "__main__":
+    # === Post-tag table and co-occurrence graph (built once, shared with the SAR script) ===
+    table_dir = ensure_post_tags(SHARD_DIR, sample_fraction=SAMPLE_FRACTION)
+    cooc = load_cooccurrence(table_dir)
+
+    # === Seeds: skills already dead (inactive for 12 months), as in the SAR analysis ===
+    lifespan = survival_dataset(table_dir, death_gap_months=12)
+    dead = np.zeros(cooc.shape[0], dtype=bool)
+    dead[lifespan["tag_id"]] = lifespan["dead"]
+    print(f"🦠 {model}: {runs} runs x {months} months from {dead.sum()} dead skills on {workers} workers...")
+
+    # === Simulate all trajectories (batched sparse mat-vecs, in a process pool) ===
+    sim = contagion_table(cooc, dead, model=model, runs=runs, steps=months, beta=beta, gamma=gamma,
+                          workers=workers)
+
+    # === Export: one row per skill, alongside skill_secondary_attack_rates.csv ===
+    # Dead skills are the infectious seeds: their simulated columns are left empty
+    ids = lifespan["tag_id"].to_numpy()
+    sim_df = pd.DataFrame({
+        "Skill": lifespan["skill"],
+        "Dead": dead[ids],
+        "Extinction Probability": np.round(sim["Extinction Probability"].to_numpy()[ids], 4),
+        "Expected Time to Death (months)": np.round(sim["Expected Time to Death"].to_numpy()[ids], 2),
+    })
+    sim_df.to_csv(output_path, index=False)
+
+    at_risk = sim_df[~sim_df["Dead"]].sort_values("Extinction Probability", ascending=False).head(10)
+    print("\n☠️ Top 10 living skills by simulated extinction probability:")
+    print(at_risk[["Skill", "Extinction Probability", "Expected Time to Death (months)"]])
+    print(f"✅ Contagion simulation saved to '{output_path}'")
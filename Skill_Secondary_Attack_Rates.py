@@ -1,114 +1,70 @@
-import os
-import ijson
 import pandas as pd
-import re
-from datetime import datetime
-from collections import defaultdict
+import numpy as np
 
-# === CONFIGURATION ===
-USE_TEST_FILE = True
-TEST_FILE = "Posts_chunk_1.json"
-chunk_folder = "C:/Users/makri/Desktop/SKILL AGEING"
-
-# === File list ===
-if USE_TEST_FILE:
-    chunk_files = [TEST_FILE]
-    print(f"🧪 TEST MODE: {TEST_FILE}")
-else:
-    chunk_files = sorted([
-        f for f in os.listdir(chunk_folder)
-        if f.startswith("Posts_chunk_") and f.endswith(".json")
-    ])
-    print(f"🚀 FULL MODE: {len(chunk_files)} chunks")
-
-chunk_paths = [os.path.join(chunk_folder, f) for f in chunk_files]
-
-# === Helpers ===
-def extract_tags(tag_str):
-    return re.findall(r'\|([^|]+)\|', tag_str) if isinstance(tag_str, str) else []
-
-# === Step 1–2: Stream posts and collect rows for tag timeline and co-occurrence ===
-rows = []
-post_skill_map = {}
+from cooccurrence import load_slices, secondary_attack_rates
+from post_scan import SHARD_DIR, ensure_post_tags, load_tag_vocab
+from survival import survival_dataset
 
-for path in chunk_paths:
-    print(f"📦 Processing {os.path.basename(path)}")
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for post in ijson.items(f, "item"):
-                try:
-                    post_id = post.get("Id")
-                    date_str = post.get("CreationDate")
-                    tags = extract_tags(post.get("Tags", ""))
-                    if not date_str or not tags:
-                        continue
-
-                    date = datetime.strptime(date_str, "%Y-%m-%dT%H:%M:%S.%f")
-
-                    for tag in tags:
-                        rows.append({
-                            "post_id": post_id,
-                            "date": date,
-                            "skill": tag
-                        })
-
-                    post_skill_map[post_id] = tags
+# === CONFIGURATION ===
+SAMPLE_FRACTION = 1.0  # e.g. 0.01 for a quick run on a deterministic 1% sample of threads
+SLICE_MONTHS = 12      # co-occurrence slices per year; 3 for quarterly SAR tables
 
-                except Exception:
-                    continue
-    except Exception as e:
-        print(f"❌ Failed to read {path}: {e}")
-        continue
+# === Post-tag table (scanned once, shared by all scripts) ===
+table_dir = ensure_post_tags(SHARD_DIR, sample_fraction=SAMPLE_FRACTION)
+vocab = load_tag_vocab(table_dir)
 
-df_exploded = pd.DataFrame(rows)
-if df_exploded.empty:
+# === Step 1–3: Lifespan and death status (inactive for 12 months) from the shared survival dataset ===
+lifespan = survival_dataset(table_dir, death_gap_months=12)
+if lifespan.empty:
     raise ValueError("No skill data collected. Check input files or parsing logic.")
-
-# === Step 3: Compute lifespan and death status ===
-skill_lifespan = df_exploded.groupby("skill").agg(
-    first_seen=("date", "min"),
-    last_seen=("date", "max"),
-    count=("date", "count")
-).reset_index()
-
-max_date = df_exploded["date"].max()
-cutoff_date = max_date - pd.DateOffset(months=12)
-skill_lifespan["dead"] = skill_lifespan["last_seen"] < cutoff_date
-
-# === Step 4: Build co-occurrence network ===
-skill_co_tags = defaultdict(set)
-for tags in post_skill_map.values():
-    for tag in tags:
-        skill_co_tags[tag].update(t for t in tags if t != tag)
-
-# === Step 5: Compute SAR ===
-dead_skills = set(skill_lifespan[skill_lifespan["dead"] == True]["skill"])
-sar_values = []
-
-for skill, co_skills in skill_co_tags.items():
-    if skill not in dead_skills:
-        continue
-
-    total_contacts = len(co_skills)
-    if total_contacts == 0:
-        infected = 0
-        sar = 0.0
-    else:
-        infected = sum(1 for co in co_skills if co in dead_skills)
-        sar = infected / total_contacts
-
-    sar_values.append({
-        "Skill": skill,
-        "Total Co-Skills": total_contacts,
-        "Dead Co-Skills": infected,
-        "Secondary Attack Rate": round(sar, 4)
-    })
+skill_lifespan = lifespan[["skill", "first_seen", "last_seen", "count", "dead"]]
+
+# === Step 4: Co-occurrence network (sparse shared-post counts, built once per table) ===
+# One slice per year (or quarter) from the same scan; the all-time network is their sum
+slices = load_slices(table_dir, period_months=SLICE_MONTHS)
+cooc = slices.window()
+
+# === Step 5: Compute SAR (dead neighbours as a sparse mat-vec) ===
+dead = np.zeros(cooc.shape[0], dtype=bool)
+dead[lifespan["tag_id"]] = lifespan["dead"]
+sar = secondary_attack_rates(cooc, dead)
+
+# Every dead skill, as before (SAR 0 when it never shared a post with another skill)
+dead_ids = lifespan.loc[lifespan["dead"], "tag_id"].to_numpy()
+sar_df = pd.DataFrame({
+    "Skill": vocab.names(dead_ids),
+    "Total Co-Skills": sar["total"][dead_ids],
+    "Dead Co-Skills": sar["dead"][dead_ids],
+    "Secondary Attack Rate": np.round(sar["sar"][dead_ids], 4),
+    "Shared Posts": sar["weighted_total"][dead_ids],
+    "Shared Posts with Dead": sar["weighted_dead"][dead_ids],
+    "Weighted SAR": np.round(sar["weighted_sar"][dead_ids], 4),
+})
 
 # === Step 6: Merge and Export ===
-sar_df = pd.DataFrame(sar_values)
 final_df = skill_lifespan.merge(sar_df, left_on="skill", right_on="Skill", how="left")
 final_df.to_csv("skill_secondary_attack_rates.csv", index=False)
 
+# === Step 6b: SAR per slice (contacts formed in each period, death status as above) ===
+# Any other window is a sum of slices: secondary_attack_rates(slices.window(dates), dead)
+# Rows for the dead skills posted in that period (the diagonal is each skill's post count)
+periodic = []
+for period, period_cooc in slices:
+    period_sar = secondary_attack_rates(period_cooc, dead)
+    ids = dead_ids[period_cooc.diagonal()[dead_ids] > 0]
+    periodic.append(pd.DataFrame({
+        "Skill": vocab.names(ids),
+        "Period": period,
+        "Total Co-Skills": period_sar["total"][ids],
+        "Dead Co-Skills": period_sar["dead"][ids],
+        "Secondary Attack Rate": np.round(period_sar["sar"][ids], 4),
+        "Shared Posts": period_sar["weighted_total"][ids],
+        "Weighted SAR": np.round(period_sar["weighted_sar"][ids], 4),
+    }))
+period_df = pd.concat(periodic, ignore_index=True) if periodic else pd.DataFrame()
+period_df.to_csv("skill_secondary_attack_rates_by_period.csv", index=False)
+print(f"📅 SAR for {len(slices.periods)} periods saved to 'skill_secondary_attack_rates_by_period.csv'")
+
 # === Step 7: Print Top 10 ===
 top_sar = sar_df.sort_values(by="Secondary Attack Rate", ascending=False).head(10)
 print("\n🔬 Top 10 Skills by Secondary Attack Rate:")
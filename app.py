@@ -4,12 +4,24 @@ import pandas as pd
 import altair as alt
 import ijson
 import os
-from collections import defaultdict
-from datetime import datetime
+
+from tag_cube import open_cube
+from trends import pair_matrix, pair_trends
 
 st.set_page_config(layout="wide")
 st.title("📊 Skill Ageing")
 
+# 🧊 Tag x month cube (memory-mapped, opened once per server process)
+TAG_CUBE_DIR = "C:/Users/makri/Desktop/SKILL AGEING/tag_cube"
+
+@st.cache_resource
+def load_cube():
+    if os.path.exists(os.path.join(TAG_CUBE_DIR, "meta.json")):
+        return open_cube(TAG_CUBE_DIR)
+    return None
+
+cube = load_cube()
+
 # -----------------------------
 # 📁 Load Epidemiological Metrics
 # -----------------------------
@@ -111,14 +123,21 @@ st.download_button("💾 Download Biology Metrics", csv_bio, "skill_biology_summ
 # -----------------------------
 st.header("🔁 Skill Trend Inversion")
 
-df_monthly = pd.read_csv("C:/Users/makri/Desktop/SKILL AGEING/monthly_top100_timeseries.csv")
-df_monthly["Month"] = pd.to_datetime(df_monthly["Month"])
-df_monthly.rename(columns={"Month": "Date"}, inplace=True)
+if cube is not None:
+    # 📌 Top 100 skills straight from the cube
+    totals = cube["posts"].sum(axis=1)
+    totals[0] = 0  # [untagged]
+    top_ids = totals.argsort()[::-1][:100]
+    timeline = pd.date_range(start="2008-01-01", end="2024-12-31", freq="MS")
+    pivot_df = cube.frame(top_ids, timeline=timeline)
+    pivot_df.index.name = "Date"
+else:
+    df_monthly = pd.read_csv("C:/Users/makri/Desktop/SKILL AGEING/monthly_top100_timeseries.csv")
+    df_monthly.rename(columns={"Month": "Date"}, inplace=True)
 
-# 📌 Create a pivot table for time series
-df_monthly.rename(columns={"Month": "Date"}, inplace=True)
-df_monthly["Date"] = pd.to_datetime(df_monthly["Date"])
-pivot_df = df_monthly.set_index("Date")
+    # 📌 Create a pivot table for time series
+    df_monthly["Date"] = pd.to_datetime(df_monthly["Date"])
+    pivot_df = df_monthly.set_index("Date")
 
 # 📌 Filter top 100 skills
 top_100_skills = pivot_df.columns.tolist()
@@ -129,28 +148,33 @@ st.sidebar.header("🧠 Trend Comparison")
 tag1 = st.sidebar.selectbox("Select Declining Skill", top_100_skills)
 tag2 = st.sidebar.selectbox("Select Competing Skill", [s for s in top_100_skills if s != tag1])
 
+# 📉 Linear regression trend slopes of every pair over its overlapping months,
+# fitted once in a batch (cached next to the cube, or per pivot without one)
+@st.cache_resource
+def load_pair_trends(top_ids):
+    return pair_trends(cube, list(top_ids), timeline)
+
+@st.cache_data
+def pivot_pair_trends(pivot_df):
+    return pair_matrix(pivot_df.to_numpy().T)
+
+if cube is not None:
+    pair_slope, pair_overlap = load_pair_trends(tuple(top_ids))
+else:
+    pair_slope, pair_overlap = pivot_pair_trends(pivot_df)
+
 # 📈 Prepare series
 s1 = pivot_df[tag1]
 s2 = pivot_df[tag2]
-mask = (s1 > 0) & (s2 > 0)
-overlap = mask.sum()
-
-# 📉 Linear regression trend slope
-from sklearn.linear_model import LinearRegression
-import numpy as np
-
-def get_slope(ts):
-    X = np.arange(len(ts)).reshape(-1, 1)
-    y = ts.values.reshape(-1, 1)
-    model = LinearRegression().fit(X, y)
-    return model.coef_[0][0]
-    
+a, b = top_100_skills.index(tag1), top_100_skills.index(tag2)
+overlap = pair_overlap[a, b]
+
 # 📊 Show trend comparison
 if overlap < 6:
     st.warning("❌ Not enough overlap between selected skills (min 6 months).")
 else:
-    slope1 = get_slope(s1[mask])
-    slope2 = get_slope(s2[mask])
+    slope1 = pair_slope[a, b]
+    slope2 = pair_slope[b, a]
 
     st.markdown(f"### {tag1} vs {tag2} — {overlap} months overlap")
     st.markdown(f"📉 **{tag1} trend slope**: `{slope1:.3f}`")
@@ -189,7 +213,10 @@ if os.path.exists(rapid_path):
     selected_skill = st.sidebar.selectbox("Select a skill to visualize:", df_rapid["Skill"].unique())
 
     # Load the full monthly time series for all skills
-    df_monthly = pd.read_csv("C:/Users/makri/Desktop/SKILL AGEING/monthly_all_timeseries.csv")
+    if cube is not None:
+        df_monthly = cube.frame([selected_skill]).rename_axis("Month").reset_index()
+    else:
+        df_monthly = pd.read_csv("C:/Users/makri/Desktop/SKILL AGEING/monthly_all_timeseries.csv")
     df_monthly["Month"] = pd.to_datetime(df_monthly["Month"])
 
     if selected_skill in df_monthly.columns:
@@ -0,0 +1,47 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from post_shards import record_ranges
+
+# === CONFIGURATION ===
+WORKERS = os.cpu_count()
+TASKS_PER_WORKER = 4  # several smaller tasks per worker keep every core busy to the end
+
+
+# === Tasks: (path, start, stop) record ranges ===
+def chunk_tasks(source, workers=WORKERS, tasks_per_worker=TASKS_PER_WORKER):
+    # A shard folder is split into equal record ranges across and inside the
+    # shards; a single JSON array file can only be read as one task
+    if os.path.isdir(source):
+        return record_ranges(source, max(1, workers * tasks_per_worker))
+    return [(source, 0, None)]
+
+
+# === Map-reduce over tasks ===
+def run_chunks(mapper, tasks, combine, initial, workers=WORKERS):
+    # `mapper(task)` runs in a worker process and returns a compact partial
+    # result; `combine(acc, result)` folds them in the main process in task
+    # order, so the outcome does not depend on which worker finishes first.
+    # Mappers must be module-level functions so they can be pickled.
+    workers = max(1, min(workers or 1, len(tasks)))
+    started = time.time()
+    acc = initial
+
+    if workers == 1:
+        results = map(mapper, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(mapper, tasks)
+
+    try:
+        for i, result in enumerate(results, start=1):
+            acc = combine(acc, result)
+            if i == len(tasks) or i % max(1, len(tasks) // 10) == 0:
+                print(f"⚙️ {i}/{len(tasks)} tasks done on {workers} workers ({time.time() - started:.0f}s)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return acc
@@ -0,0 +1,115 @@
+import os
+import tempfile
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from chunk_runner import WORKERS, run_chunks
+from cooccurrence import contact_graph
+
+# === CONFIGURATION ===
+SIM_SEED = 2024
+RUNS = 2000        # stochastic trajectories
+RUNS_PER_TASK = 64  # trajectories advanced together as the columns of one state matrix
+STEPS = 60          # months simulated
+BETA = 0.5          # transmission rate per month at full exposure
+GAMMA = 0.1         # SIR: dying -> dead per month; SIS: dying -> revived per month
+
+
+# === Stochastic SIR / SIS on the co-occurrence graph ===
+# A skill is Susceptible (alive), Infected (dying, spreads to its co-tags) or,
+# in SIR, Removed (dead). Exposure of a skill is the share of its shared posts
+# that are with dying skills, so one month of all trajectories is a single
+# sparse x dense product: p_infect = 1 - exp(-beta * W_norm @ I).
+def transmission_matrix(cooc):
+    # Row-normalised shared-post weights (each row sums to 1, isolated tags stay 0)
+    weights = contact_graph(cooc).astype(np.float64)
+    strength = np.asarray(weights.sum(axis=1)).ravel()
+    scale = np.divide(1.0, strength, out=np.zeros_like(strength), where=strength > 0)
+    return (sp.diags(scale) @ weights).tocsr().astype(np.float32)
+
+
+def simulate(transmission, seeds, runs, rng, model="SIR", steps=STEPS, beta=BETA, gamma=GAMMA):
+    # Advances `runs` trajectories together; returns per-skill totals over them:
+    # dead at the end, runs in which it died, and the sum of its months to death.
+    # SIR: dead is Removed, reached at the month of the dying -> dead step.
+    # SIS: nothing stays dead, so "dead" is dying at the end and the time is
+    # the month it first became dying. Seeds start out dying (infectious); their
+    # own totals only reflect gamma and are masked out by contagion_table.
+    n = transmission.shape[0]
+    infected = np.repeat(np.asarray(seeds, dtype=bool)[:, None], runs, axis=1)
+    susceptible = ~infected
+    removed = np.zeros((n, runs), dtype=bool)
+    death_time = np.full((n, runs), -1, dtype=np.int32)
+    if model == "SIS":
+        death_time[infected] = 0
+
+    for t in range(1, steps + 1):
+        exposure = transmission @ infected.astype(np.float32)
+        new = susceptible & (rng.random((n, runs), dtype=np.float32) < -np.expm1(-beta * exposure))
+        recover = infected & (rng.random((n, runs), dtype=np.float32) < gamma)
+        infected = (infected & ~recover) | new
+        susceptible &= ~new
+        if model == "SIS":
+            susceptible |= recover
+            death_time[new & (death_time < 0)] = t
+        else:
+            removed |= recover
+            death_time[recover] = t
+
+    died = death_time >= 0
+    dead_at_end = removed if model == "SIR" else infected
+    return (dead_at_end.sum(axis=1), died.sum(axis=1),
+            np.where(died, death_time, 0).sum(axis=1, dtype=np.int64))
+
+
+# === Shared inputs: written once, read once per worker process ===
+# Tasks only carry the path, their run count and child seed, so the graph is
+# not pickled into every task.
+def _save_inputs(path, transmission, seeds):
+    np.savez(path, data=transmission.data, indices=transmission.indices, indptr=transmission.indptr,
+             shape=transmission.shape, seeds=np.asarray(seeds, dtype=bool))
+
+
+@lru_cache(maxsize=1)
+def _load_inputs(path):
+    with np.load(path) as data:
+        transmission = sp.csr_matrix((data["data"], data["indices"], data["indptr"]), shape=tuple(data["shape"]))
+        return transmission, data["seeds"]
+
+
+def _simulate_task(job):
+    path, runs, seed, model, steps, beta, gamma = job
+    transmission, seeds = _load_inputs(path)
+    return runs, simulate(transmission, seeds, runs, np.random.default_rng(seed), model, steps, beta, gamma)
+
+
+def _combine(acc, result):
+    runs, (dead, died, time_sum) = result
+    if acc is None:
+        return runs, dead, died, time_sum
+    return acc[0] + runs, acc[1] + dead, acc[2] + died, acc[3] + time_sum
+
+
+def contagion_table(cooc, seeds, model="SIR", runs=RUNS, steps=STEPS, beta=BETA, gamma=GAMMA,
+                    seed=SIM_SEED, workers=WORKERS, runs_per_task=RUNS_PER_TASK):
+    # Per tag id: probability of being dead after `steps` months and the expected
+    # months to death in the runs where it dies (see simulate for SIS). Seeds are
+    # only sources of the contagion: both columns are NaN for them. Tasks get
+    # their own child seeds, so the table does not depend on the number of workers.
+    sizes = [min(runs_per_task, runs - lo) for lo in range(0, runs, runs_per_task)]
+    child_seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "contagion_inputs.npz")
+        _save_inputs(path, transmission_matrix(cooc), seeds)
+        tasks = [(path, size, child, model, steps, beta, gamma) for size, child in zip(sizes, child_seeds)]
+        total, dead, died, time_sum = run_chunks(_simulate_task, tasks, _combine, None, workers)
+        _load_inputs.cache_clear()
+
+    source = np.asarray(seeds, dtype=bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return pd.DataFrame({
+            "Extinction Probability": np.where(source, np.nan, dead / total),
+            "Expected Time to Death": np.where(source | (died == 0), np.nan, time_sum / died),
+        })
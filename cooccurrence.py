@@ -0,0 +1,159 @@
+import os
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from post_scan import POST_TAGS_DIR, load_post_tags, load_tag_vocab
+from tag_cube import month_positions
+from tag_decode import MONTH_ORIGIN
+from tag_partials import TABLE_BLOCK_ROWS
+from tag_vocab import UNTAGGED_ID
+
+# === Tag co-occurrence graph from the post-tag table ===
+# With B the posts x tags incidence matrix, C = B^T B holds the number of
+# posts shared by every pair of tags (the diagonal is each tag's post count).
+# The table stores the tags of a post in consecutive rows, so it is read in
+# blocks cut at post boundaries and the per-block products are summed.
+def _post_blocks(post_id, block_rows):
+    start, n = 0, len(post_id)
+    while start < n:
+        stop = min(start + block_rows, n)
+        while stop < n and post_id[stop] == post_id[stop - 1]:
+            stop += 1
+        yield start, stop
+        start = stop
+
+
+def block_cooccurrence(post_id, tag_id, n_tags):
+    # Shared-post counts for the rows of one block; a tag repeated within a
+    # post still counts once, and untagged posts have no edges
+    keep = tag_id != UNTAGGED_ID
+    post_id, tag_id = post_id[keep], tag_id[keep]
+    if len(post_id) == 0:
+        return sp.csr_matrix((n_tags, n_tags), dtype=np.int64)
+    post_local = np.cumsum(np.r_[0, post_id[1:] != post_id[:-1]])
+    incidence = sp.csr_matrix((np.ones(len(tag_id), dtype=np.int64), (post_local, tag_id)),
+                              shape=(post_local[-1] + 1, n_tags))
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+    return (incidence.T @ incidence).tocsr()
+
+
+# === Time slices: one matrix per year or quarter, from the same scan ===
+# Every post falls in exactly one period (by its CreationDate), so the slices
+# add up to the all-time matrix and a window of periods is a sum of slices.
+class CoTagSlices:
+    def __init__(self, periods, matrices, period_months, n_tags):
+        self.periods = np.asarray(periods, dtype=np.int64)  # period i covers months [i * period_months, ...)
+        self.matrices = matrices
+        self.period_months = period_months
+        self.n_tags = n_tags
+
+    def labels(self):
+        # "2009" for yearly slices, "2009Q1" for quarters, "2009-01" for months
+        months = self.periods * self.period_months + MONTH_ORIGIN[1] - 1
+        labels = pd.PeriodIndex.from_fields(year=MONTH_ORIGIN[0] + months // 12, month=months % 12 + 1, freq="M")
+        freq = {12: "Y", 3: "Q"}.get(self.period_months, "M")
+        return labels.asfreq(freq).astype(str).tolist()
+
+    def window(self, window=None):
+        # Shared-post counts over a monthly window (any date_range/period_range),
+        # rounded out to whole periods; all periods when window is None
+        keep = np.ones(len(self.periods), dtype=bool)
+        if window is not None:
+            months = month_positions(window)
+            keep = ((self.periods + 1) * self.period_months > months.min()) & \
+                   (self.periods * self.period_months <= months.max())
+        total = sp.csr_matrix((self.n_tags, self.n_tags), dtype=np.int64)
+        for matrix in (m for m, k in zip(self.matrices, keep) if k):
+            total = total + matrix
+        return total
+
+    def __iter__(self):
+        return iter(zip(self.labels(), self.matrices))
+
+    # === Storage: all slices as one COO triple list ===
+    def save(self, path):
+        coo = [m.tocoo() for m in self.matrices]
+        np.savez(path, period=np.repeat(self.periods, [m.nnz for m in coo]).astype(np.int64),
+                 row=np.concatenate([m.row for m in coo] or [np.empty(0, dtype=np.int32)]),
+                 col=np.concatenate([m.col for m in coo] or [np.empty(0, dtype=np.int32)]),
+                 data=np.concatenate([m.data for m in coo] or [np.empty(0, dtype=np.int64)]),
+                 periods=self.periods, period_months=self.period_months, n_tags=self.n_tags)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            n_tags = int(data["n_tags"])
+            periods = data["periods"]
+            bounds = np.searchsorted(data["period"], np.r_[periods, periods[-1] + 1] if len(periods) else [0])
+            matrices = [sp.csr_matrix((data["data"][lo:hi], (data["row"][lo:hi], data["col"][lo:hi])),
+                                      shape=(n_tags, n_tags)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+            return cls(periods, matrices, int(data["period_months"]), n_tags)
+
+
+def build_slices(table_dir=POST_TAGS_DIR, period_months=12, block_rows=TABLE_BLOCK_ROWS):
+    table = load_post_tags(table_dir, columns=["post_id", "tag_id", "month_index"])
+    n_tags = len(load_tag_vocab(table_dir))
+
+    slices = {}
+    for start, stop in _post_blocks(table["post_id"], block_rows):
+        post_id = np.asarray(table["post_id"][start:stop])
+        tag_id = np.asarray(table["tag_id"][start:stop])
+        period = np.asarray(table["month_index"][start:stop]) // period_months
+        for p in np.unique(period):
+            rows = period == p  # a post's rows share its month, so posts stay whole
+            matrix = block_cooccurrence(post_id[rows], tag_id[rows], n_tags)
+            slices[p] = slices[p] + matrix if p in slices else matrix
+
+    periods = sorted(slices)
+    return CoTagSlices(periods, [slices[p] for p in periods], period_months, n_tags)
+
+
+def load_slices(table_dir=POST_TAGS_DIR, period_months=12):
+    # Built once per table and slice length, kept next to the table (rebuilt after a rescan)
+    path = os.path.join(table_dir, f"cotags_{period_months}m.npz")
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(os.path.join(table_dir, "meta.json")):
+        return CoTagSlices.load(path)
+    slices = build_slices(table_dir, period_months)
+    slices.save(path)
+    return slices
+
+
+def load_cooccurrence(table_dir=POST_TAGS_DIR):
+    # All-time shared-post counts: the sum of the yearly slices
+    return load_slices(table_dir).window()
+
+
+# === Contacts and secondary attack rates as sparse mat-vecs ===
+def contact_graph(cooc):
+    # Off-diagonal shared-post weights; contacts are its non-zero entries
+    weights = cooc.tocsr(copy=True)
+    weights.setdiag(0)
+    weights.eliminate_zeros()
+    return weights
+
+
+def secondary_attack_rates(cooc, dead):
+    # Per tag: distinct co-tags, dead co-tags and their ratio (SAR), plus the
+    # same counted in shared posts (a co-tag seen on 50 posts weighs 50)
+    weights = contact_graph(cooc)
+    contacts = weights.copy()
+    contacts.data[:] = 1
+    dead = np.asarray(dead, dtype=np.float64)
+
+    total = np.asarray(contacts.sum(axis=1)).ravel()
+    infected = contacts @ dead
+    weighted_total = np.asarray(weights.sum(axis=1)).ravel().astype(np.float64)
+    weighted_infected = weights @ dead
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sar = np.where(total > 0, infected / total, 0.0)
+        weighted_sar = np.where(weighted_total > 0, weighted_infected / weighted_total, 0.0)
+    return {
+        "total": total.astype(np.int64),
+        "dead": infected.astype(np.int64),
+        "sar": sar,
+        "weighted_total": weighted_total.astype(np.int64),
+        "weighted_dead": weighted_infected.astype(np.int64),
+        "weighted_sar": weighted_sar,
+    }
@@ -0,0 +1,376 @@
+import numpy as np
+
+# === CONFIGURATION ===
+MEMORY_MB = 256  # budget for one tile of the correlation matrix
+
+
+def block_size(memory_mb=MEMORY_MB, arrays=1):
+    # Rows per tile so that `arrays` float64 tiles of block x block fit the budget
+    return max(1, int(np.sqrt(memory_mb * 2 ** 20 / (8 * arrays))))
+
+
+# === Standardized rows: r(i, j) == z[i] @ z[j] ===
+def standardize(counts):
+    # Centres every row and scales it to unit length. Constant rows (where
+    # Series.corr gives NaN) are returned as NaN so they never match anything.
+    x = np.asarray(counts, dtype=np.float64)
+    x = x - x.mean(axis=1, keepdims=True)
+    norm = np.sqrt((x * x).sum(axis=1, keepdims=True))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(norm > 0, x / norm, np.nan)
+
+
+def _strips(n, block):
+    # Row strips [lo, hi) with every column block to their right, upper triangle only
+    for lo in range(0, n, block):
+        hi = min(lo + block, n)
+        yield lo, hi, [(c, min(c + block, n)) for c in range(lo, n, block)]
+
+
+def _upper_pairs(r, lo, c_lo, keep):
+    # Row/column positions of the tile entries selected by `keep`, above the diagonal
+    i, j = np.nonzero(keep)
+    i, j = i + lo, j + c_lo
+    upper = j > i
+    return i[upper], j[upper], r[keep][upper]
+
+
+# === Pairs below a threshold, streamed strip by strip ===
+def iter_pairs_below(z, threshold, memory_mb=MEMORY_MB):
+    # Yields (i, j, r) arrays for every pair i < j with r < threshold, in the
+    # same (i, j) order as itertools.combinations. Only one tile of the
+    # correlation matrix is held at a time.
+    n = len(z)
+    block = block_size(memory_mb)
+    for lo, hi, columns in _strips(n, block):
+        found = []
+        for c_lo, c_hi in columns:
+            r = z[lo:hi] @ z[c_lo:c_hi].T
+            with np.errstate(invalid="ignore"):
+                found.append(_upper_pairs(r, lo, c_lo, r < threshold))
+        i, j, r = (np.concatenate(parts) for parts in zip(*found))
+        order = np.lexsort((j, i))
+        yield i[order], j[order], r[order]
+
+
+# === The k most negative pairs, with a fixed-size running selection ===
+def most_negative_pairs(z, k, memory_mb=MEMORY_MB):
+    # Returns (i, j, r) for the k pairs with the lowest r, most negative first.
+    # Each tile only contributes its own k lowest entries below the running k-th
+    # best, picked on the flat tile before any (i, j) is formed; the budget
+    # covers the tile plus the candidate positions and values taken from it.
+    n = len(z)
+    block = block_size(memory_mb, arrays=4)
+    best_i = best_j = np.empty(0, dtype=np.int64)
+    best_r = np.empty(0)
+    for lo, hi, columns in _strips(n, block):
+        for c_lo, c_hi in columns:
+            r = z[lo:hi] @ z[c_lo:c_hi].T
+            r[np.isnan(r)] = np.inf
+            if c_lo == lo:
+                r[np.tri(hi - lo, c_hi - c_lo, dtype=bool)] = np.inf  # diagonal and below
+            flat = r.ravel()
+            cutoff = best_r.max() if len(best_r) == k else np.inf
+            pos = np.flatnonzero(flat < cutoff)
+            if len(pos) > k:
+                pos = pos[np.argpartition(flat[pos], k - 1)[:k]]
+            i, j = np.divmod(pos, c_hi - c_lo)
+            best_i = np.concatenate([best_i, i + lo])
+            best_j = np.concatenate([best_j, j + c_lo])
+            best_r = np.concatenate([best_r, flat[pos]])
+            if len(best_r) > k:
+                top = np.argpartition(best_r, k - 1)[:k]
+                best_i, best_j, best_r = best_i[top], best_j[top], best_r[top]
+    order = np.lexsort((best_j, best_i, best_r))
+    return best_i[order], best_j[order], best_r[order]
+
+
+# === Overlap-masked correlation: only months where both tags have posts ===
+# With B = (X > 0) the indicator matrix, every masked sum of a pair is an entry
+# of a matrix product: overlap n = B B', sums X B' and B X', sums of squares
+# X^2 B' and B X^2', cross sums X X' (X is already zero outside its own mask).
+# For integer monthly counts every product is an exact integer in float64.
+def masked_correlation_tile(x_a, x_b):
+    # (r, overlap) for every row of x_a against every row of x_b
+    b_a, b_b = (x_a > 0).astype(np.float64), (x_b > 0).astype(np.float64)
+    n = b_a @ b_b.T
+    s_a, s_b = x_a @ b_b.T, b_a @ x_b.T
+    var_a = n * ((x_a * x_a) @ b_b.T) - s_a * s_a
+    var_b = n * (b_a @ (x_b * x_b).T) - s_b * s_b
+    cov = n * (x_a @ x_b.T) - s_a * s_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where((var_a > 0) & (var_b > 0), cov / np.sqrt(var_a * var_b), np.nan)
+    return np.clip(r, -1.0, 1.0), n.astype(np.int64)
+
+
+def masked_correlation_matrix(counts):
+    # Dense (r, overlap) for all pairs of a few thousand tags at once
+    x = np.asarray(counts, dtype=np.float64)
+    return masked_correlation_tile(x, x)
+
+
+def iter_masked_pairs_below(counts, threshold, min_overlap, memory_mb=MEMORY_MB):
+    # Yields (i, j, r, overlap) for every pair i < j sharing at least
+    # `min_overlap` active months with masked r < threshold, strip by strip
+    x = np.asarray(counts, dtype=np.float64)
+    block = block_size(memory_mb, arrays=8)
+    for lo, hi, columns in _strips(len(x), block):
+        found = []
+        for c_lo, c_hi in columns:
+            r, n = masked_correlation_tile(x[lo:hi], x[c_lo:c_hi])
+            with np.errstate(invalid="ignore"):
+                keep = (n >= min_overlap) & (r < threshold)
+            i, j, r_keep = _upper_pairs(r, lo, c_lo, keep)
+            found.append((i, j, r_keep, n[i - lo, j - c_lo]))
+        i, j, r, n = (np.concatenate(parts) for parts in zip(*found))
+        order = np.lexsort((j, i))
+        yield i[order], j[order], r[order], n[order]
+
+
+# === Sign random-projection LSH over standardized rows ===
+# Each table hashes a row to `n_bits` signs of random projections. Two rows at
+# angle theta agree on a bit with probability 1 - theta / pi, and for unit
+# rows r == cos(theta), so strongly correlated rows tend to share a bucket
+# and strongly anti-correlated rows land in the complementary bucket (every
+# bit flipped). Candidates from all tables are re-ranked with exact r, so the
+# result has no false positives; a pair at |r| is missed by all L tables with
+# probability (1 - p ** n_bits) ** L, p = 1 - arccos(|r|) / pi. Given a
+# threshold, lsh_params picks n_bits and L so that pairs right at it are
+# found with probability >= LSH_RECALL (and stronger pairs more often).
+LSH_TABLES = 32
+LSH_SEED = 2024
+LSH_RECALL = 0.95         # target recall for a pair exactly at the threshold
+LSH_MAX_TABLES = 256      # fewer bits (bigger buckets) beyond this many tables
+LSH_MAX_BUCKET = 4096     # buckets larger than this are left out of candidate_pairs
+LSH_PAIR_BATCH = 10_000_000  # candidate pairs expanded at once in candidate_pairs
+
+
+def lsh_bits(n_rows):
+    # ~16 rows per bucket
+    return int(min(30, max(1, np.round(np.log2(max(n_rows, 2))) - 4)))
+
+
+def lsh_recall(r, n_bits, n_tables):
+    # Probability that a pair at correlation r (in the searched direction) shares
+    # a bucket pair in at least one table
+    p_bit = 1 - np.arccos(np.clip(np.abs(r), 0.0, 1.0)) / np.pi
+    return 1 - (1 - p_bit ** n_bits) ** n_tables
+
+
+def lsh_params(n_rows, threshold, recall=LSH_RECALL, max_tables=LSH_MAX_TABLES):
+    # (n_bits, n_tables) reaching `recall` at |r| == |threshold|: the most bits
+    # (smallest buckets, fewest candidates) that need at most `max_tables` tables
+    p_bit = 1 - np.arccos(min(abs(threshold), 1.0)) / np.pi
+    for n_bits in range(lsh_bits(n_rows), 0, -1):
+        p = p_bit ** n_bits
+        n_tables = 1 if p >= 1 else max(1, int(np.ceil(np.log1p(-recall) / np.log1p(-p))))
+        if n_tables <= max_tables or n_bits == 1:
+            return n_bits, n_tables
+
+
+class SignLSH:
+    def __init__(self, z, n_tables=None, n_bits=None, seed=LSH_SEED, threshold=None, recall=LSH_RECALL,
+                 max_bucket=LSH_MAX_BUCKET):
+        # With a threshold, unset n_bits / n_tables come from lsh_params;
+        # otherwise the defaults are ~16 rows per bucket and LSH_TABLES tables
+        self.z = np.asarray(z, dtype=np.float64)
+        self.valid = ~np.isnan(self.z).any(axis=1)  # constant rows have no direction
+        if threshold is not None:
+            bits, tables = lsh_params(int(self.valid.sum()), threshold, recall)
+            n_bits, n_tables = n_bits or bits, n_tables or tables
+        self.n_bits = n_bits or lsh_bits(int(self.valid.sum()))
+        self.n_tables = n_tables = n_tables or LSH_TABLES
+        self.max_bucket = max_bucket
+        self.skipped_pairs = 0  # pairs in oversized buckets left out by the last candidate_pairs
+        self.mask = (1 << self.n_bits) - 1
+        rng = np.random.default_rng(seed)
+        planes = rng.standard_normal((n_tables, self.n_bits, self.z.shape[1]))
+        weights = 1 << np.arange(self.n_bits, dtype=np.int64)
+
+        rows = np.flatnonzero(self.valid)
+        self.tables = []
+        for t in range(n_tables):
+            codes = ((self.z[rows] @ planes[t].T) > 0).astype(np.int64) @ weights
+            order = np.argsort(codes, kind="stable")
+            keys, starts = np.unique(codes[order], return_index=True)
+            self.tables.append((codes, rows[order], keys, np.append(starts, len(order))))
+        self.codes = np.column_stack([table[0] for table in self.tables]) if self.tables else None
+        self.row_pos = np.full(len(self.z), -1)
+        self.row_pos[rows] = np.arange(len(rows))
+
+    def _bucket(self, table, code):
+        _, members, keys, bounds = table
+        k = np.searchsorted(keys, code)
+        if k == len(keys) or keys[k] != code:
+            return members[:0]
+        return members[bounds[k]:bounds[k + 1]]
+
+    def rerank(self, i, j):
+        # Exact r for candidate pairs, in batches to bound memory
+        r = np.empty(len(i))
+        for lo in range(0, len(i), 1_000_000):
+            hi = lo + 1_000_000
+            r[lo:hi] = np.einsum("ij,ij->i", self.z[i[lo:hi]], self.z[j[lo:hi]])
+        return r
+
+    # === One row: sublinear candidate lookup + exact re-ranking ===
+    def query(self, row, sign=-1, threshold=None):
+        # Rows most anti-correlated (sign=-1) or correlated (sign=+1) with `row`,
+        # as (rows, r) sorted by r in that direction
+        pos = self.row_pos[row]
+        if pos < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        buckets = []
+        for t, table in enumerate(self.tables):
+            code = self.codes[pos, t]
+            buckets.append(self._bucket(table, code if sign > 0 else ~code & self.mask))
+        candidates = np.unique(np.concatenate(buckets))
+        candidates = candidates[candidates != row]
+        r = self.z[candidates] @ self.z[row]
+        if threshold is not None:
+            hit = r < threshold if sign < 0 else r > threshold
+            candidates, r = candidates[hit], r[hit]
+        order = np.argsort(r if sign < 0 else -r, kind="stable")
+        return candidates[order], r[order]
+
+    def recall(self, r):
+        # Probability of finding a pair at correlation r with this index
+        return lsh_recall(r, self.n_bits, self.n_tables)
+
+    # === All pairs: join every bucket with its partner bucket ===
+    def candidate_pairs(self, sign=-1):
+        # Bucket joins are expanded LSH_PAIR_BATCH pairs at a time. Joins where
+        # either bucket has more than `max_bucket` rows (heavily skewed hashes)
+        # are skipped and counted in skipped_pairs; the other tables still see
+        # those pairs under different projections.
+        n = len(self.z)
+        found = []
+        self.skipped_pairs = 0
+        for codes, members, keys, bounds in self.tables:
+            partner = keys if sign > 0 else ~keys & self.mask
+            k = np.searchsorted(keys, partner)
+            present = (k < len(keys)) & (keys[np.minimum(k, len(keys) - 1)] == partner)
+            # Each bucket pair once: a bucket with itself, or with a larger partner code
+            g = np.flatnonzero(present & (keys <= partner))
+            h = k[g]
+            a_start, a_size = bounds[g], bounds[g + 1] - bounds[g]
+            b_start, b_size = bounds[h], bounds[h + 1] - bounds[h]
+            pairs = a_size * b_size
+            small = (a_size <= self.max_bucket) & (b_size <= self.max_bucket)
+            self.skipped_pairs += int(pairs[~small].sum())
+            a_start, a_size, b_start, b_size, pairs = (v[small] for v in (a_start, a_size, b_start, b_size, pairs))
+
+            ends = np.cumsum(pairs)
+            batch_of = ends // LSH_PAIR_BATCH
+            for batch in np.unique(batch_of):
+                sel = batch_of == batch
+                a0, b0, bn, p = a_start[sel], b_start[sel], b_size[sel], pairs[sel]
+                offset = np.arange(p.sum()) - np.repeat(np.cumsum(p) - p, p)
+                left = members[np.repeat(a0, p) + offset // np.repeat(bn, p)]
+                right = members[np.repeat(b0, p) + offset % np.repeat(bn, p)]
+                i, j = np.minimum(left, right), np.maximum(left, right)
+                found.append(np.unique(i[i < j] * n + j[i < j]))
+        keys = np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+        return keys // n, keys % n
+
+    def pairs_below(self, threshold, sign=-1):
+        # (i, j, r) for candidate pairs i < j beyond `threshold`, in (i, j) order
+        i, j = self.candidate_pairs(sign)
+        r = self.rerank(i, j)
+        hit = r < threshold if sign < 0 else r > threshold
+        return i[hit], j[hit], r[hit]
+
+
+# === Lagged cross-correlation via FFT ===
+# r(i, j, L) is the Pearson correlation of x_i[t] with x_j[t + L] over the
+# months both sides cover (L > 0: j follows i by L months). The cross sums for
+# every lag come from one inverse FFT per pair; the per-lag sums and sums of
+# squares of each side come from prefix sums, so every lag gets the exact
+# Pearson r of its overlap rather than a tapered estimate.
+MAX_LAG = 36
+
+
+def _fft_size(n_months, max_lag):
+    size = 1
+    while size < n_months + max_lag:
+        size *= 2
+    return size
+
+
+class LaggedSeries:
+    def __init__(self, counts, max_lag=MAX_LAG):
+        x = standardize(counts)  # centring/scaling does not change any lag's r
+        self.valid = ~np.isnan(x).any(axis=1)
+        self.x = np.where(self.valid[:, None], x, 0.0)
+        n_months = self.x.shape[1]
+        self.max_lag = min(max_lag, n_months - 2)
+        self.lags = np.arange(-self.max_lag, self.max_lag + 1)
+        self.size = _fft_size(n_months, self.max_lag)
+        self.spectrum = np.fft.rfft(self.x, n=self.size, axis=1)
+
+        # Windows per lag: i covers [a_lo, a_hi), j covers [b_lo, b_hi)
+        self.n = n_months - np.abs(self.lags)
+        a_lo, a_hi = np.maximum(0, -self.lags), n_months - np.maximum(0, self.lags)
+        b_lo, b_hi = np.maximum(0, self.lags), n_months - np.maximum(0, -self.lags)
+        p1 = np.zeros((len(self.x), n_months + 1))
+        p2 = np.zeros((len(self.x), n_months + 1))
+        np.cumsum(self.x, axis=1, out=p1[:, 1:])
+        np.cumsum(self.x * self.x, axis=1, out=p2[:, 1:])
+        self.sum_a, self.sq_a = p1[:, a_hi] - p1[:, a_lo], p2[:, a_hi] - p2[:, a_lo]
+        self.sum_b, self.sq_b = p1[:, b_hi] - p1[:, b_lo], p2[:, b_hi] - p2[:, b_lo]
+
+    def _r(self, cross, a, b):
+        # cross: (..., lags) raw cross sums; a, b: row indexes broadcastable to it
+        n = self.n
+        cov = cross - self.sum_a[a] * self.sum_b[b] / n
+        var_a = self.sq_a[a] - self.sum_a[a] ** 2 / n
+        var_b = self.sq_b[b] - self.sum_b[b] ** 2 / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = np.where((var_a > 1e-12) & (var_b > 1e-12), cov / np.sqrt(var_a * var_b), np.nan)
+        return np.clip(r, -1.0, 1.0)
+
+    def _cross(self, spec_a, spec_b):
+        full = np.fft.irfft(np.conj(spec_a) * spec_b, n=self.size, axis=-1)
+        return full[..., self.lags % self.size]
+
+    def correlations(self, i, j):
+        # (pairs, lags) r for explicit pairs i[k], j[k]
+        i, j = np.asarray(i), np.asarray(j)
+        return self._r(self._cross(self.spectrum[i], self.spectrum[j]), i, j)
+
+    def best(self, r, direction="negative"):
+        # Best lag and its r along the last axis: most negative, most positive or
+        # largest |r|. Where no lag has a finite r (a constant series) the r is
+        # NaN; for a single pair's 1-D r that comes back as (None, nan).
+        score = {"negative": r, "positive": -r, "abs": -np.abs(r)}[direction]
+        k = np.argmin(np.where(np.isnan(score), np.inf, score), axis=-1)
+        best_r = np.take_along_axis(r, k[..., None], axis=-1)[..., 0]
+        if np.ndim(r) == 1:
+            return (None, np.nan) if np.isnan(best_r) else (int(self.lags[k]), float(best_r))
+        return self.lags[k], best_r
+
+    # === All pairs i < j, strip by strip ===
+    def iter_best_lags(self, threshold=None, direction="negative", memory_mb=MEMORY_MB):
+        # Yields (i, j, lag, r, r_at_zero) for every pair whose best lagged r is
+        # beyond `threshold` (all pairs when None), in itertools.combinations order
+        n = len(self.x)
+        per_row = n * (self.size * 8 + self.spectrum.shape[1] * 16 + len(self.lags) * 8 * 4)
+        block = max(1, int(memory_mb * 2 ** 20 // max(per_row, 1)))
+        zero = self.max_lag
+        for lo in range(0, n, block):
+            hi = min(lo + block, n)
+            cross = self._cross(self.spectrum[lo:hi, None, :], self.spectrum[None, lo:, :])
+            r = self._r(cross, np.arange(lo, hi)[:, None], np.arange(lo, n)[None, :])
+            lag, best_r = self.best(r, direction)
+            i, j = np.nonzero(np.arange(lo, n)[None, :] > np.arange(lo, hi)[:, None])
+            keep = self.valid[i + lo] & self.valid[j + lo] & ~np.isnan(best_r[i, j])
+            if threshold is not None:
+                with np.errstate(invalid="ignore"):
+                    if direction == "negative":
+                        keep &= best_r[i, j] < threshold
+                    elif direction == "positive":
+                        keep &= best_r[i, j] > threshold
+                    else:
+                        keep &= np.abs(best_r[i, j]) > abs(threshold)
+            i, j = i[keep], j[keep]
+            yield i + lo, j + lo, lag[i, j], best_r[i, j], r[i, j, zero]
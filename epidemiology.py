@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from post_sample import count_stderr, ratio_stderr
+from tag_cube import month_positions
+from tag_decode import MONTH_ORIGIN
+
+NO_BASELINE = 999  # % change and mortality ratio when there is nothing to compare against
+RECENT_MONTHS = 6  # a skill is dead when the last 6 months of the recent window are empty
+
+
+def window_label(window):
+    # "2023" for a calendar year, "2022-07..2023-06" for anything else
+    window = pd.DatetimeIndex(window)
+    first, last = window.min().to_period("M"), window.max().to_period("M")
+    if first.month == 1 and last.month == 12 and first.year == last.year:
+        return str(first.year)
+    return f"{first}..{last}"
+
+
+def _metrics(total, incidence, old_incidence, recent_activity):
+    # Shared by the window-pair table and the year panel; works on tags or tags x years arrays
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct_change = np.where(old_incidence > 0, 100 * (incidence - old_incidence) / old_incidence,
+                              np.where(incidence > 0, NO_BASELINE, 0))
+        rest = total - incidence
+        mortality_ratio = np.where(rest > 0, incidence / rest, NO_BASELINE)
+        prevalence_ratio = np.where(total > 0, incidence / total, 0.0)
+
+    is_dead = recent_activity == 0
+    was_active = (old_incidence > 0) | (incidence > 0)
+    return {
+        "% Change in Incidence": np.round(pct_change, 2),
+        "Incidence : Prevalence": np.round(prevalence_ratio, 4),
+        "Mortality Risk": np.where(is_dead, "☠️", np.where(pct_change < -20, "🟡", "🟢")),
+        "Revived?": np.where((old_incidence < incidence) & (old_incidence > 0), "Yes", "No"),
+        "Incidence : Mortality Ratio": np.round(mortality_ratio, 2),
+        "CFR": np.where(was_active & is_dead, 1.0, 0.0),
+    }
+
+
+# === Prefix sums over the tags x months matrix ===
+# Any window's incidence is prefix[:, hi] - prefix[:, lo], so a table for a new
+# (recent, baseline) pair costs O(tags) instead of another pass over the months.
+class EpidemiologyPanel:
+    def __init__(self, counts, timeline, names, sample_fraction=1.0, authors=None):
+        # `counts` has one row per entry of `names` and one column per month of a
+        # contiguous monthly `timeline`. Rows with no posts at all are dropped; the
+        # rest keep their input order so sorting ties break as in the per-tag loop.
+        # `authors(window)`, when given, returns distinct authors per input row
+        # and adds the active community size columns.
+        counts = np.asarray(counts, dtype=np.float64)
+        total = counts.sum(axis=1)
+        keep = total > 0
+        counts = counts[keep]
+        self.rows = np.flatnonzero(keep)
+        self.authors = authors
+
+        self.names = np.asarray(names, dtype=object)[keep]
+        self.timeline = pd.DatetimeIndex(timeline)
+        self.months = month_positions(timeline)
+        self.sample_fraction = sample_fraction
+        self.total = total[keep]
+        self.attack_rate = ((counts > 0).sum(axis=1) / counts.shape[1] if counts.shape[1]
+                            else np.zeros(len(self.total)))
+        self.prefix = np.zeros((counts.shape[0], counts.shape[1] + 1))
+        np.cumsum(counts, axis=1, out=self.prefix[:, 1:])
+
+    def __len__(self):
+        return len(self.names)
+
+    def _bounds(self, first_month, last_month):
+        # Month indexes (inclusive) -> [lo, hi) column range of the timeline
+        lo = np.searchsorted(self.months, first_month, side="left")
+        hi = np.searchsorted(self.months, last_month, side="right")
+        return lo, np.maximum(hi, lo)
+
+    def window_sum(self, window):
+        months = month_positions(window)
+        lo, hi = self._bounds(months.min(), months.max())
+        return self.prefix[:, hi] - self.prefix[:, lo]
+
+    def since_sum(self, since):
+        lo = self.timeline.searchsorted(since, side="left")
+        return self.prefix[:, -1] - self.prefix[:, lo]
+
+    def community(self, window):
+        return np.rint(np.asarray(self.authors(window))[self.rows]).astype(np.int64)
+
+    # === One (recent, baseline) window pair ===
+    def table(self, recent_window, older_window, recent_since=None):
+        if recent_since is None:
+            recent_since = (pd.DatetimeIndex(recent_window).max().to_period("M") - (RECENT_MONTHS - 1)).to_timestamp()
+        incidence = self.window_sum(recent_window)
+        old_incidence = self.window_sum(older_window)
+        recent_label, older_label = window_label(recent_window), window_label(older_window)
+
+        table = pd.DataFrame({
+            "Skill": self.names,
+            "Total Posts": np.rint(self.total).astype(np.int64),
+            f"Incidence ({recent_label})": np.rint(incidence).astype(np.int64),
+            f"Incidence ({older_label})": np.rint(old_incidence).astype(np.int64),
+            **_metrics(self.total, incidence, old_incidence, self.since_sum(recent_since)),
+            "Attack Rate": np.round(self.attack_rate, 4),
+        })
+
+        # 👥 Active community size: distinct authors posting in each window
+        if self.authors is not None:
+            table[f"Active Community ({recent_label})"] = self.community(recent_window)
+            table[f"Active Community ({older_label})"] = self.community(older_window)
+
+        # 📏 Sampling standard errors, only for a sampled cube
+        if self.sample_fraction < 1.0:
+            f = self.sample_fraction
+            table["Total Posts SE"] = np.round(count_stderr(self.total * f, f), 2)
+            table[f"Incidence ({recent_label}) SE"] = np.round(count_stderr(incidence * f, f), 2)
+            table[f"Incidence ({older_label}) SE"] = np.round(count_stderr(old_incidence * f, f), 2)
+            table["% Change SE"] = np.round(100 * ratio_stderr(incidence * f, old_incidence * f, f), 2)
+
+        return table
+
+    # === Every year against the year before, in one pass ===
+    def year_panel(self, first_year=2009, last_year=2024):
+        # Long skill x year table: each year is the recent window and the previous
+        # calendar year its baseline, as in the 2023 vs 2022 table. "Dead" looks at
+        # July-December of that year only, and prevalence counts posts up to the
+        # end of that year, so no row depends on later years.
+        years = np.arange(first_year, last_year + 1)
+        jan = (years - MONTH_ORIGIN[0]) * 12 + 1 - MONTH_ORIGIN[1]  # month index of each January
+
+        def year_sums(first_month, last_month):
+            lo, hi = self._bounds(first_month, last_month)
+            return self.prefix[:, hi] - self.prefix[:, lo]
+
+        incidence = year_sums(jan, jan + 11)
+        old_incidence = year_sums(jan - 12, jan - 1)
+        recent_activity = year_sums(jan + 12 - RECENT_MONTHS, jan + 11)
+        # Prevalence as of each year: every post up to its December
+        total = self.prefix[:, self._bounds(jan, jan + 11)[1]]
+
+        metrics = _metrics(total, incidence, old_incidence, recent_activity)
+        panel = pd.DataFrame({
+            "Skill": np.repeat(self.names, len(years)),
+            "Year": np.tile(years, len(self)),
+            "Incidence": np.rint(incidence).astype(np.int64).ravel(),
+            "Baseline Incidence": np.rint(old_incidence).astype(np.int64).ravel(),
+            **{name: values.ravel() for name, values in metrics.items()},
+        })
+
+        if self.authors is not None:
+            community = [self.community(pd.date_range(f"{year}-01-01", f"{year}-12-31", freq="ME"))
+                         for year in years]
+            panel["Active Community"] = np.column_stack(community).ravel()
+
+        if self.sample_fraction < 1.0:
+            f = self.sample_fraction
+            panel["Incidence SE"] = np.round(count_stderr(incidence * f, f), 2).ravel()
+            panel["% Change SE"] = np.round(100 * ratio_stderr(incidence * f, old_incidence * f, f), 2).ravel()
+
+        return panel
+
+
+def epidemiology_table(counts, timeline, recent_window, older_window, recent_since, names,
+                       sample_fraction=1.0):
+    # Every column of epidemiological_skill_metrics.csv at once
+    panel = EpidemiologyPanel(counts, timeline, names, sample_fraction)
+    return panel.table(recent_window, older_window, recent_since)
@@ -0,0 +1,52 @@
+import numpy as np
+
+# === Deterministic post sampling ===
+# A post is in the sample when a 64-bit hash of its thread id (the question id;
+# answers use their ParentId) falls below fraction * 2^64. The same posts are
+# picked on every run and in every shard, and a question and its answers are
+# always kept or dropped together.
+SAMPLE_SEED = 0x5EED
+
+
+def hash64(values, seed=SAMPLE_SEED):
+    # splitmix64 finalizer, vectorized over uint64
+    with np.errstate(over="ignore"):
+        z = np.asarray(values).astype(np.uint64) + np.uint64((0x9E3779B97F4A7C15 + seed) & 0xFFFFFFFFFFFFFFFF)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def sample_mask(post_id, parent_id, fraction, seed=SAMPLE_SEED):
+    if fraction >= 1.0:
+        return np.ones(len(post_id), dtype=bool)
+    thread_id = np.where(np.asarray(parent_id) > 0, parent_id, post_id)
+    threshold = np.uint64(int(fraction * 2 ** 53))
+    return (hash64(thread_id, seed) >> np.uint64(11)) < threshold
+
+
+# === Scaling sampled counts back up ===
+def scale_counts(raw, fraction):
+    # Horvitz-Thompson estimate of the full-corpus count
+    return np.asarray(raw) / fraction if fraction < 1.0 else np.asarray(raw)
+
+
+def count_stderr(raw, fraction):
+    # Standard error of scale_counts() under Bernoulli sampling of threads:
+    # Var(n / f) = N (1 - f) / f, estimated with N ~ n / f
+    raw = np.asarray(raw, dtype=np.float64)
+    if fraction >= 1.0:
+        return np.zeros_like(raw)
+    return np.sqrt(raw * (1.0 - fraction)) / fraction
+
+
+def ratio_stderr(num_raw, den_raw, fraction):
+    # Delta-method standard error of (num / den) for two independent sampled counts
+    num = scale_counts(num_raw, fraction).astype(np.float64)
+    den = scale_counts(den_raw, fraction).astype(np.float64)
+    num_se = count_stderr(num_raw, fraction)
+    den_se = count_stderr(den_raw, fraction)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = num / den
+        se = np.abs(ratio) * np.sqrt((num_se / num) ** 2 + (den_se / den) ** 2)
+    return np.where((num > 0) & (den > 0), se, 0.0)
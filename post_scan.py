@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import ijson
+import subprocess
+import numpy as np
+import pandas as pd
+from itertools import islice
+
+from chunk_runner import WORKERS, chunk_tasks, run_chunks
+from post_sample import sample_mask
+from post_shards import shard_paths, iter_lines
+from tag_hll import AuthorSketch
+from tag_vocab import TagVocab, TAG_VOCAB_PATH
+from tag_decode import MONTH_ORIGIN, column, decode_tags, decode_dates, decode_ints
+
+# === CONFIGURATION ===
+DATA_DIR = "C:/Users/makri/Desktop/SKILL AGEING"
+SHARD_DIR = os.path.join(DATA_DIR, "Posts_shards")
+POST_TAGS_DIR = os.path.join(DATA_DIR, "post_tags")
+
+BATCH_POSTS = 200_000
+
+# === Columnar post-tag table: one row per (post, tag) ===
+COLUMNS = {
+    "post_id": "int64",
+    "tag_id": "int32",
+    "month_index": "int16",
+    "created": "int64",  # milliseconds since 1970-01-01
+    "score": "int32",
+    "views": "int32",
+    "answers": "int32",
+    "post_type": "int8",
+    "parent_id": "int64",  # question id for answers, 0 otherwise
+    "owner_id": "int32",   # OwnerUserId, 0 when missing
+}
+AUTHORS_NAME = "authors_hll.npz"  # distinct-author sketch per tag-month, see tag_hll.py
+
+
+# === Input: batches of posts as DataFrames ===
+def iter_shard_batches(shard_path, start=0, stop=None, batch_size=BATCH_POSTS):
+    lines = iter_lines(shard_path, start, stop)
+    while True:
+        batch = [json.loads(line) for line in islice(lines, batch_size)]
+        if not batch:
+            break
+        yield pd.DataFrame(batch)
+
+
+def iter_post_batches(source, batch_size=BATCH_POSTS):
+    # `source` is a shard folder written by post_shards.py / XMLtoJSON.py,
+    # a single .ndjson shard, or a JSON array file such as Posts_chunk_1.json
+    if os.path.isdir(source):
+        for path in shard_paths(source):
+            print(f"📦 Scanning {os.path.basename(path)}...")
+            yield from iter_shard_batches(path, batch_size=batch_size)
+    elif source.endswith(".ndjson"):
+        yield from iter_shard_batches(source, batch_size=batch_size)
+    else:
+        print(f"📦 Scanning {os.path.basename(source)}...")
+        with open(source, "r", encoding="utf-8") as f:
+            posts = ijson.items(f, "item")
+            while True:
+                batch = list(islice(posts, batch_size))
+                if not batch:
+                    break
+                yield pd.DataFrame(batch)
+
+
+def iter_task_batches(task, batch_size=BATCH_POSTS):
+    # One (path, start, stop) task from chunk_runner.chunk_tasks()
+    path, start, stop = task
+    if path.endswith(".ndjson"):
+        yield from iter_shard_batches(path, start, stop, batch_size)
+    else:
+        yield from iter_post_batches(path, batch_size)
+
+
+def post_tags_dir(sample_fraction=1.0):
+    # Sampled tables live next to the full one, e.g. post_tags_sample0.01
+    if sample_fraction >= 1.0:
+        return POST_TAGS_DIR
+    return f"{POST_TAGS_DIR}_sample{sample_fraction:g}"
+
+
+# === Decode one batch into post-tag rows ===
+def decode_posts(posts, vocab, sample_fraction=1.0):
+    month_index, created, valid = decode_dates(column(posts, "CreationDate"))
+    post_id = pd.to_numeric(column(posts, "Id"), errors="coerce")
+    valid &= post_id.notna().to_numpy()
+    skipped = int((~valid).sum())
+    parent_id = decode_ints(column(posts, "ParentId"))
+    post_id = post_id.fillna(0).to_numpy().astype(np.int64)
+    valid &= sample_mask(post_id, parent_id, sample_fraction)
+
+    indptr, tag_ids = decode_tags(column(posts, "Tags"), vocab)
+    lengths = np.diff(indptr)
+
+    per_post = {
+        "post_id": post_id,
+        "month_index": month_index,
+        "created": created,
+        "score": decode_ints(column(posts, "Score")),
+        "views": decode_ints(column(posts, "ViewCount")),
+        "answers": decode_ints(column(posts, "AnswerCount")),
+        "post_type": decode_ints(column(posts, "PostTypeId")),
+        "parent_id": parent_id,
+        "owner_id": decode_ints(column(posts, "OwnerUserId")),
+    }
+
+    keep = np.repeat(valid, lengths)
+    rows = {name: np.repeat(values, lengths)[keep] for name, values in per_post.items()}
+    rows["tag_id"] = tag_ids[keep]
+    return rows, skipped
+
+
+# === Scan ===
+def _scan_task(job):
+    # Worker: decode one record range into part files, with chunk-local tag ids
+    task, part_prefix, casefold, sample_fraction = job
+    vocab = TagVocab(casefold=casefold)
+    files = {name: open(f"{part_prefix}.{name}.bin", "wb") for name in COLUMNS}
+    rows = skipped = 0
+    authors = []
+
+    for posts in iter_task_batches(task):
+        batch, batch_skipped = decode_posts(posts, vocab, sample_fraction)
+        for name, dtype in COLUMNS.items():
+            batch[name].astype(dtype).tofile(files[name])
+        authors.append(AuthorSketch.from_rows(batch["tag_id"], batch["month_index"], batch["owner_id"]))
+        rows += len(batch["tag_id"])
+        skipped += batch_skipped
+
+    for f in files.values():
+        f.close()
+    return part_prefix, list(vocab.names()), rows, skipped, AuthorSketch.merge(authors)
+
+
+def scan_posts(source=SHARD_DIR, out_dir=POST_TAGS_DIR, vocab_path=TAG_VOCAB_PATH, workers=WORKERS,
+               sample_fraction=1.0):
+    os.makedirs(out_dir, exist_ok=True)
+    files = {name: open(os.path.join(out_dir, f"{name}.bin"), "wb") for name in COLUMNS}
+    vocab = TagVocab.load(vocab_path)
+    known_tags = len(vocab)
+
+    tasks = chunk_tasks(source, workers)
+    jobs = [(task, os.path.join(out_dir, f"part_{i:05d}"), vocab.casefold, sample_fraction)
+            for i, task in enumerate(tasks, start=1)]
+
+    # Parts are appended in task order and their local tag ids mapped onto the
+    # shared vocabulary, so the table is identical for any worker count
+    def combine(totals, result):
+        part_prefix, names, rows, skipped, authors = result
+        lut = vocab.intern_many(names)
+        for name, dtype in COLUMNS.items():
+            part_path = f"{part_prefix}.{name}.bin"
+            values = np.fromfile(part_path, dtype=dtype)
+            if name == "tag_id":
+                values = lut[values]
+            values.astype(dtype).tofile(files[name])
+            os.remove(part_path)
+        return totals[0] + rows, totals[1] + skipped, AuthorSketch.merge([totals[2], authors.remap(lut)])
+
+    rows, skipped, authors = run_chunks(_scan_task, jobs, combine, (0, 0, AuthorSketch.empty()), workers)
+    authors.save(os.path.join(out_dir, AUTHORS_NAME))
+
+    for f in files.values():
+        f.close()
+
+    # The shared vocabulary keeps ids stable across rescans; the table keeps
+    # its own snapshot so it can always be decoded on its own
+    vocab.save(vocab_path)
+    vocab.save(os.path.join(out_dir, "tag_vocab.json"))
+
+    meta = {
+        "rows": rows,
+        "columns": COLUMNS,
+        "month_origin": "%04d-%02d" % MONTH_ORIGIN,
+        "source": os.path.basename(os.path.normpath(source)),
+        "sample_fraction": sample_fraction,
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ {rows} post-tag rows written to {out_dir} ({skipped} posts skipped)")
+    print(f"🏷 Tag vocabulary: {len(vocab)} tags, {len(vocab) - known_tags} new")
+    return meta
+
+
+def ensure_post_tags(source=SHARD_DIR, table_dir=None, sample_fraction=1.0):
+    # Scan once; every later run reuses the table on disk. The scan runs as its
+    # own program so its worker pool never re-imports the calling script.
+    table_dir = table_dir or post_tags_dir(sample_fraction)
+    if not table_is_current(table_dir):
+        subprocess.run([sys.executable, os.path.abspath(__file__), source, table_dir, str(sample_fraction)],
+                       check=True)
+    return table_dir
+
+
+def table_is_current(table_dir=POST_TAGS_DIR):
+    # False when the table is missing or was written before a column was added
+    if not os.path.exists(os.path.join(table_dir, "meta.json")):
+        return False
+    return (set(COLUMNS) <= set(load_table_meta(table_dir)["columns"])
+            and os.path.exists(os.path.join(table_dir, AUTHORS_NAME)))
+
+
+# === Readers ===
+def load_table_meta(table_dir=POST_TAGS_DIR):
+    with open(os.path.join(table_dir, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta.setdefault("sample_fraction", 1.0)
+    return meta
+
+
+def load_post_tags(table_dir=POST_TAGS_DIR, columns=None):
+    # Returns {column: read-only np.memmap}; nothing is read until it is used
+    meta = load_table_meta(table_dir)
+
+    table = {}
+    for name, dtype in meta["columns"].items():
+        if columns is not None and name not in columns:
+            continue
+        if meta["rows"] == 0:
+            table[name] = np.empty(0, dtype=dtype)
+        else:
+            table[name] = np.memmap(os.path.join(table_dir, f"{name}.bin"),
+                                    dtype=dtype, mode="r", shape=(meta["rows"],))
+    return table
+
+
+def load_tag_vocab(table_dir=POST_TAGS_DIR):
+    return TagVocab.load(os.path.join(table_dir, "tag_vocab.json"))
+
+
+def load_authors(table_dir=POST_TAGS_DIR):
+    return AuthorSketch.load(os.path.join(table_dir, AUTHORS_NAME))
+
+
+# Usage: python post_scan.py [source] [table_dir] [sample_fraction]
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else SHARD_DIR
+    sample_fraction = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    table_dir = sys.argv[2] if len(sys.argv) > 2 else post_tags_dir(sample_fraction)
+    scan_posts(source, table_dir, sample_fraction=sample_fraction)
@@ -0,0 +1,162 @@
+import os
+import re
+import json
+from array import array
+
+# === Shard layout ===
+# Posts_shard_00001.ndjson      one post per line, each line a complete JSON object
+# Posts_shard_00001.ndjson.idx  int64 byte offsets: start of every record + end of file
+# Posts_manifest.json           rows, bytes and min/max CreationDate per shard
+SHARD_NAME = "Posts_shard_{:05d}.ndjson"
+INDEX_SUFFIX = ".idx"
+MANIFEST_NAME = "Posts_manifest.json"
+TARGET_BYTES = 256 * 1024 * 1024
+
+date_pattern = re.compile(rb'"@?CreationDate":\s*"([^"]+)"')
+
+
+# === Index sidecar ===
+def write_index(shard_path, offsets):
+    with open(shard_path + INDEX_SUFFIX, "wb") as f:
+        array("q", offsets).tofile(f)
+
+
+def read_index(shard_path):
+    offsets = array("q")
+    with open(shard_path + INDEX_SUFFIX, "rb") as f:
+        offsets.frombytes(f.read())
+    return offsets
+
+
+# === Manifest ===
+def write_manifest(out_dir, shards, source):
+    manifest = {
+        "source": source,
+        "rows": sum(s["rows"] for s in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_manifest(shard_dir):
+    with open(os.path.join(shard_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# === Writer: one shard at a time, rolled over at target_bytes ===
+class ShardWriter:
+    def __init__(self, out_dir, target_bytes=TARGET_BYTES):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.target_bytes = target_bytes
+        self.shards = []
+        self._file = None
+
+    def _open_next(self):
+        self.close()
+        name = SHARD_NAME.format(len(self.shards) + 1)
+        self._path = os.path.join(self.out_dir, name)
+        self._file = open(self._path, "wb")
+        self._offsets = [0]
+        self._min_date = self._max_date = None
+
+    def write(self, line, date=None):
+        # `line` is one serialized JSON object (bytes, no trailing newline)
+        if self._file is None or self._offsets[-1] >= self.target_bytes:
+            self._open_next()
+        self._file.write(line)
+        self._file.write(b"\n")
+        self._offsets.append(self._offsets[-1] + len(line) + 1)
+
+        if date:
+            if self._min_date is None or date < self._min_date:
+                self._min_date = date
+            if self._max_date is None or date > self._max_date:
+                self._max_date = date
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.close()
+        write_index(self._path, self._offsets)
+        self.shards.append({
+            "file": os.path.basename(self._path),
+            "rows": len(self._offsets) - 1,
+            "min_date": self._min_date,
+            "max_date": self._max_date,
+            "bytes": self._offsets[-1],
+        })
+        self._file = None
+
+
+def shard_posts_json(json_path, out_dir, target_bytes=TARGET_BYTES):
+    # Accepts the `[\n{...},\n{...}\n]` array written by XMLtoJSON.py as well as
+    # the old Posts_chunk_*.json pieces, which are the same lines without brackets
+    writer = ShardWriter(out_dir, target_bytes)
+
+    with open(json_path, "rb") as f:
+        for raw in f:
+            line = raw.strip()
+            if line.startswith(b"["):
+                line = line[1:].lstrip()
+            if line.endswith(b"]"):
+                line = line[:-1].rstrip()
+            if line.endswith(b","):
+                line = line[:-1].rstrip()
+            if not line:
+                continue
+
+            match = date_pattern.search(line)
+            writer.write(line, match.group(1).decode() if match else None)
+
+    writer.close()
+    return write_manifest(out_dir, writer.shards, os.path.basename(json_path))
+
+
+# === Readers ===
+def shard_paths(shard_dir, start_date=None, end_date=None):
+    # Dates compare as ISO strings, so "2023" or "2023-07" work as bounds.
+    # Shards whose date range lies outside [start_date, end_date] are skipped
+    # using the manifest alone.
+    paths = []
+    for shard in load_manifest(shard_dir)["shards"]:
+        if start_date and shard["max_date"] and shard["max_date"] < start_date:
+            continue
+        if end_date and shard["min_date"] and shard["min_date"][:len(end_date)] > end_date:
+            continue
+        paths.append(os.path.join(shard_dir, shard["file"]))
+    return paths
+
+
+def iter_lines(shard_path, start=0, stop=None):
+    offsets = read_index(shard_path)
+    n_records = len(offsets) - 1
+    stop = n_records if stop is None else min(stop, n_records)
+    if start >= stop:
+        return
+
+    with open(shard_path, "rb") as f:
+        f.seek(offsets[start])
+        for _ in range(stop - start):
+            yield f.readline()
+
+
+def iter_records(shard_path, start=0, stop=None):
+    for line in iter_lines(shard_path, start, stop):
+        yield json.loads(line)
+
+
+def record_ranges(shard_dir, n_splits, start_date=None, end_date=None):
+    # Splits the selected shards into (path, start, stop) record ranges of
+    # roughly equal row count, so work can be spread over n_splits workers
+    paths = shard_paths(shard_dir, start_date, end_date)
+    counts = [len(read_index(p)) - 1 for p in paths]
+    per_split = max(1, -(-sum(counts) // max(1, n_splits)))
+
+    ranges = []
+    for path, n_records in zip(paths, counts):
+        for start in range(0, n_records, per_split):
+            ranges.append((path, start, min(start + per_split, n_records)))
+    return ranges
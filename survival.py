@@ -0,0 +1,199 @@
+"""Shared survival dataset and grouped survival estimators.
+
+survival_dataset() gives one row per skill: first/last seen, post count,
+dead (no post within death_gap_months before the cutoff, 12 by default),
+duration in whole days and duration_months in whole calendar months. It is
+built once from the post-tag table and cached next to it, so the survival
+scripts load it instead of re-reading the post chunks.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+from post_scan import POST_TAGS_DIR, load_post_tags, load_tag_vocab
+from tag_partials import TABLE_BLOCK_ROWS
+from tag_vocab import UNTAGGED_ID
+
+DEATH_GAP_MONTHS = 12  # a skill is dead when its last post is this long before the cutoff
+MS_PER_DAY = 86_400_000
+
+
+# === Per-tag first/last CreationDate and post count, one block of rows at a time ===
+def lifespan_aggregates(table_dir=POST_TAGS_DIR, cutoff_ms=None, block_rows=TABLE_BLOCK_ROWS):
+    table = load_post_tags(table_dir, columns=["tag_id", "created"])
+    n_tags = len(load_tag_vocab(table_dir))
+    first = np.full(n_tags, np.iinfo(np.int64).max, dtype=np.int64)
+    last = np.full(n_tags, np.iinfo(np.int64).min, dtype=np.int64)
+    count = np.zeros(n_tags, dtype=np.int64)
+
+    for start in range(0, len(table["tag_id"]), block_rows):
+        tag_id = np.asarray(table["tag_id"][start:start + block_rows])
+        created = np.asarray(table["created"][start:start + block_rows])
+        keep = tag_id != UNTAGGED_ID
+        if cutoff_ms is not None:
+            keep &= created <= cutoff_ms  # posts after the cutoff have not been observed yet
+        tag_id, created = tag_id[keep], created[keep]
+        np.minimum.at(first, tag_id, created)
+        np.maximum.at(last, tag_id, created)
+        count += np.bincount(tag_id, minlength=n_tags)
+
+    tag_ids = np.flatnonzero(count)
+    return tag_ids, first[tag_ids], last[tag_ids], count[tag_ids]
+
+
+def months_between(first_ms, last_ms):
+    # Whole calendar months from first to last: (year, month) difference, minus
+    # one when the later day/time of month has not been reached yet, i.e. the
+    # largest n with last - DateOffset(months=n) >= first (same rule as `dead`)
+    first = pd.DatetimeIndex(pd.to_datetime(first_ms, unit="ms"))
+    last = pd.DatetimeIndex(pd.to_datetime(last_ms, unit="ms"))
+    months = (last.year - first.year) * 12 + (last.month - first.month)
+    first_in_month = first - first.to_period("M").to_timestamp()
+    last_in_month = last - last.to_period("M").to_timestamp()
+    return np.asarray(months - (last_in_month < first_in_month), dtype=np.int64)
+
+
+# === Survival dataset: one row per skill ===
+def build_survival_dataset(table_dir=POST_TAGS_DIR, death_gap_months=DEATH_GAP_MONTHS, cutoff=None):
+    # cutoff: end of observation (default: the last tagged post); dead means no
+    # post within death_gap_months before it. duration is in whole days, as
+    # (last_seen - first_seen).dt.days; duration_months in whole calendar months.
+    cutoff_ms = None if cutoff is None else int(pd.Timestamp(cutoff).value // 1_000_000)
+    tag_ids, first, last, count = lifespan_aggregates(table_dir, cutoff_ms)
+
+    end = pd.to_datetime(last.max() if cutoff is None else cutoff_ms, unit="ms")
+    death_line = int((end - pd.DateOffset(months=death_gap_months)).value // 1_000_000)
+    return pd.DataFrame({
+        "skill": load_tag_vocab(table_dir).names(tag_ids),
+        "tag_id": tag_ids,
+        "first_seen": pd.to_datetime(first, unit="ms"),
+        "last_seen": pd.to_datetime(last, unit="ms"),
+        "count": count,
+        "dead": last < death_line,
+        "duration": (last - first) // MS_PER_DAY,
+        "duration_months": months_between(first, last),
+    }).sort_values("skill", ignore_index=True)
+
+
+def survival_dataset(table_dir=POST_TAGS_DIR, death_gap_months=DEATH_GAP_MONTHS, cutoff=None):
+    # Built once per table, death gap and cutoff, and kept next to the table
+    # (rebuilt after a rescan); later calls only read a small pickle
+    cutoff_key = "last" if cutoff is None else pd.Timestamp(cutoff).strftime("%Y%m%d%H%M%S")
+    path = os.path.join(table_dir, f"survival_gap{death_gap_months}_{cutoff_key}.pkl")
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(os.path.join(table_dir, "meta.json")):
+        return pd.read_pickle(path)
+    lifespan = build_survival_dataset(table_dir, death_gap_months, cutoff)
+    lifespan.to_pickle(path)
+    return lifespan
+
+
+# === Grouped Kaplan-Meier / Nelson-Aalen: every stratum in one sort-and-scan ===
+# Rows are sorted by (group, duration) once; deaths and exits per distinct time
+# come from bincounts, the number at risk from a reverse cumulative sum inside
+# each group, and the products/sums over time from group-wise cumulative sums.
+# Estimates, Greenwood variance and confidence bounds follow lifelines
+# (exponential Greenwood CI for KM, smoothed Nelson-Aalen with a log CI), so
+# each group's rows match KaplanMeierFitter / NelsonAalenFitter on that group.
+def _group_cumsum(values, group_start):
+    total = np.cumsum(values)
+    return total - np.repeat(np.r_[0, total][group_start], np.diff(np.r_[group_start, len(values)]))
+
+
+def _harmonic(n, power=1):
+    # sum_{k=1..n} 1 / k**power for integer arrays (0 for n <= 0)
+    table = np.r_[0.0, np.cumsum(1.0 / np.arange(1, max(int(n.max(initial=0)), 1) + 1) ** power)]
+    return table[np.maximum(n, 0)]
+
+
+def grouped_estimates(durations, events, groups=None, alpha=0.05):
+    # Long format: one row per (group, time) with the event table and estimates;
+    # time 0 is always included, as in lifelines' timeline
+    from scipy.stats import norm
+
+    durations = np.asarray(durations, dtype=np.float64)
+    events = np.asarray(events, dtype=bool)
+    # A missing group label is a stratum of its own rather than a -1 code
+    codes, labels = pd.factorize(pd.Series(groups if groups is not None else np.zeros(len(durations), dtype=int)),
+                                 sort=True, use_na_sentinel=False)
+
+    # Distinct (group, time) keys, with a time-0 entry for every group
+    keys = np.concatenate([codes, np.arange(len(labels))])
+    times = np.concatenate([durations, np.zeros(len(labels))])
+    order = np.lexsort((times, keys))
+    keys, times = keys[order], times[order]
+    is_new = np.ones(len(keys), dtype=bool)
+    is_new[1:] = (keys[1:] != keys[:-1]) | (times[1:] != times[:-1])
+    slot = np.cumsum(is_new) - 1
+    key, time = keys[is_new], times[is_new]
+
+    real = order < len(durations)  # the added time-0 entries are not subjects
+    removed = np.bincount(slot, weights=real, minlength=len(key)).astype(np.int64)
+    observed = np.bincount(slot, weights=real & np.r_[events, np.zeros(len(labels), dtype=bool)][order],
+                           minlength=len(key)).astype(np.int64)
+    group_start = np.flatnonzero(np.r_[len(key) > 0, key[1:] != key[:-1]])
+    group_size = np.bincount(codes, minlength=len(labels))
+    at_risk = np.repeat(group_size, np.diff(np.r_[group_start, len(key)])) - _group_cumsum(removed, group_start) + removed
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Kaplan-Meier with Greenwood's variance sum; a time where everyone at
+        # risk dies sets the curve to 0 (kept out of the log sums)
+        survivors = at_risk - observed
+        log_s = _group_cumsum(np.where(survivors > 0, np.log(survivors) - np.log(at_risk), 0.0), group_start)
+        wiped_out = _group_cumsum((at_risk > 0) & (survivors == 0), group_start) > 0
+        km = np.where(wiped_out, 0.0, np.exp(log_s))
+        greenwood_terms = observed / (at_risk * survivors)
+        greenwood = _group_cumsum(np.where(np.isfinite(greenwood_terms), greenwood_terms, 0.0), group_start)
+        z = norm.ppf(1 - alpha / 2)
+        v = np.log(km)
+        km_lower = np.exp(-np.exp(np.log(-v) - z * np.sqrt(greenwood) / v))
+        km_upper = np.exp(-np.exp(np.log(-v) + z * np.sqrt(greenwood) / v))
+
+        # Nelson-Aalen (ties smoothed as 1/n + 1/(n-1) + ... like lifelines)
+        na = _group_cumsum(_harmonic(at_risk) - _harmonic(at_risk - observed), group_start)
+        na_var = _group_cumsum(_harmonic(at_risk, 2) - _harmonic(at_risk - observed, 2), group_start)
+        spread = np.exp(z * np.sqrt(na_var) / np.where(na == 0, 1, na))
+
+    level = f"{1 - alpha:g}"
+    return pd.DataFrame({
+        "group": labels[key],
+        "timeline": time,
+        "at_risk": at_risk,
+        "observed": observed,
+        "censored": removed - observed,
+        "KM_estimate": km,
+        "KM_variance": km * km * greenwood,
+        f"KM_estimate_lower_{level}": np.nan_to_num(km_lower, nan=1.0),
+        f"KM_estimate_upper_{level}": np.nan_to_num(km_upper, nan=1.0),
+        "NA_estimate": na,
+        "NA_variance": na_var,
+        f"NA_estimate_lower_{level}": na / spread,
+        f"NA_estimate_upper_{level}": na * spread,
+    })
+
+
+def median_survival(curves):
+    # First time each group's KM estimate reaches 0.5 (inf if it never does)
+    below = curves[curves["KM_estimate"] <= 0.5]
+    medians = below.groupby("group", sort=False, dropna=False)["timeline"].min()
+    return medians.reindex(curves["group"].unique()).fillna(np.inf)
+
+
+def plot_estimates(curves, column="KM_estimate", groups=None, ci_show=False, ax=None, **kwargs):
+    # Step plots in the style of lifelines' plot_survival_function /
+    # plot_cumulative_hazard, one line per group (labelled with its name), in the
+    # order of `groups` when given
+    import matplotlib.pyplot as plt
+
+    ax = ax or plt.gca()
+    by_group = {group: curve for group, curve in curves.groupby("group", sort=False, dropna=False)}
+    for group in (by_group if groups is None else groups):
+        if group not in by_group:
+            continue
+        curve = by_group[group]
+        line, = ax.plot(curve["timeline"], curve[column], drawstyle="steps-post", label=kwargs.get("label", group))
+        if ci_show:
+            lower = [c for c in curve.columns if c.startswith(f"{column}_lower_")][0]
+            upper = [c for c in curve.columns if c.startswith(f"{column}_upper_")][0]
+            ax.fill_between(curve["timeline"], curve[lower], curve[upper], step="post", alpha=0.25,
+                            color=line.get_color(), linewidth=1.0)
+    return ax
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+from chunk_runner import WORKERS, run_chunks
+from survival import grouped_estimates, median_survival
+
+# === CONFIGURATION ===
+BOOT_SEED = 2024
+REPLICATES = 2000
+REPLICATES_PER_TASK = 50  # resamples fitted together (as strata of one grouped pass) per task
+GRID_POINTS = 200         # survival curves are compared on this many common time points
+
+
+# === Weibull MLE for many samples at once ===
+# With S(t) = exp(-(t / lambda) ** rho) and right-censoring, the profile score
+# mean_w(ln t) - 1 / rho - mean_events(ln t), with weights t ** rho, increases
+# with rho, so every row is solved by the same bisection on log(rho);
+# lambda = (sum t ** rho / deaths) ** (1 / rho). Same estimates as WeibullFitter.
+def weibull_mle(durations, events, iterations=100):
+    log_t = np.log(np.asarray(durations, dtype=np.float64))
+    events = np.asarray(events, dtype=np.float64)
+    log_t, events = np.atleast_2d(log_t), np.atleast_2d(events)
+    deaths = events.sum(axis=1)
+    event_mean = (events * log_t).sum(axis=1) / np.maximum(deaths, 1)
+
+    def score(log_rho):
+        rho = np.exp(log_rho)[:, None]
+        z = rho * log_t
+        w = np.exp(z - z.max(axis=1, keepdims=True))
+        return (w * log_t).sum(axis=1) / w.sum(axis=1) - 1 / rho[:, 0] - event_mean
+
+    lo = np.full(len(log_t), np.log(1e-4))
+    hi = np.full(len(log_t), np.log(1e3))
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        below = score(mid) < 0
+        lo, hi = np.where(below, mid, lo), np.where(below, hi, mid)
+    rho = np.exp((lo + hi) / 2)
+
+    # lambda from log-sum-exp of rho * ln t
+    z = rho[:, None] * log_t
+    top = z.max(axis=1)
+    log_sum = top + np.log(np.exp(z - top[:, None]).sum(axis=1))
+    with np.errstate(divide="ignore"):
+        lam = np.exp((log_sum - np.log(deaths)) / rho)
+    return np.where(deaths > 0, lam, np.nan), np.where(deaths > 0, rho, np.nan)
+
+
+# === Bootstrap over skills ===
+def step_values(curves, column, grid):
+    # Each group's step function evaluated on a common grid -> groups x grid
+    values = []
+    for _, curve in curves.groupby("group", sort=True):
+        at = np.searchsorted(curve["timeline"].to_numpy(), grid, side="right") - 1
+        values.append(curve[column].to_numpy()[np.maximum(at, 0)])
+    return np.array(values)
+
+
+def _bootstrap_task(job):
+    durations, events, grid, replicates, seed = job
+    rng = np.random.default_rng(seed)
+    n = len(durations)
+    idx = rng.integers(0, n, size=(replicates, n))
+    curves = grouped_estimates(durations[idx].ravel(), events[idx].ravel(), np.repeat(np.arange(replicates), n))
+    survival = step_values(curves, "KM_estimate", grid)
+    lam, rho = weibull_mle(durations[idx], events[idx])
+    return survival, median_survival(curves).to_numpy(), lam, rho
+
+
+def _combine(acc, result):
+    return [part + [r] for part, r in zip(acc, result)]
+
+
+def bootstrap_survival(durations, events, replicates=REPLICATES, seed=BOOT_SEED, grid=None, alpha=0.05,
+                       workers=WORKERS, replicates_per_task=REPLICATES_PER_TASK):
+    # Percentile bands from `replicates` resamples of the skills. Each task has
+    # its own child seed, so the result does not depend on the number of workers.
+    durations = np.asarray(durations, dtype=np.float64)
+    events = np.asarray(events, dtype=bool)
+    if grid is None:
+        grid = np.linspace(0, durations.max(), GRID_POINTS)
+
+    sizes = [min(replicates_per_task, replicates - lo) for lo in range(0, replicates, replicates_per_task)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(durations, events, grid, size, child) for size, child in zip(sizes, seeds)]
+    survival, median, lam, rho = (np.concatenate(part) for part in
+                                  run_chunks(_bootstrap_task, tasks, _combine, [[], [], [], []], workers))
+
+    # Point estimates on the full sample
+    point = grouped_estimates(durations, events)
+    point_survival = step_values(point, "KM_estimate", grid)[0]
+    point_lam, point_rho = weibull_mle(durations, events)
+
+    q = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    level = f"{1 - alpha:g}"
+    with np.errstate(invalid="ignore"):
+        bands = np.percentile(survival, q, axis=0)
+        weibull_bands = np.nanpercentile(np.exp(-(grid[None, :] / lam[:, None]) ** rho[:, None]), q, axis=0)
+    curve = pd.DataFrame({
+        "KM_estimate": point_survival,
+        f"KM_estimate_lower_{level}": bands[0],
+        f"KM_estimate_upper_{level}": bands[1],
+        "Weibull_estimate": np.exp(-(grid / point_lam[0]) ** point_rho[0]),
+        f"Weibull_estimate_lower_{level}": weibull_bands[0],
+        f"Weibull_estimate_upper_{level}": weibull_bands[1],
+    }, index=pd.Index(grid, name="timeline"))
+
+    # Medians can be inf (curve never reaches 0.5): take observed order statistics
+    median_bounds = np.percentile(median, q, method="inverted_cdf")
+    estimates = pd.DataFrame({
+        "estimate": [median_survival(point).iloc[0], point_lam[0], point_rho[0]],
+        f"lower_{level}": [median_bounds[0], np.nanpercentile(lam, q[0]), np.nanpercentile(rho, q[0])],
+        f"upper_{level}": [median_bounds[1], np.nanpercentile(lam, q[1]), np.nanpercentile(rho, q[1])],
+    }, index=["median lifetime", "lambda", "rho"])
+    return curve, estimates
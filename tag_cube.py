@@ -0,0 +1,214 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+from post_sample import scale_counts
+from post_scan import (DATA_DIR, SHARD_DIR, POST_TAGS_DIR, AUTHORS_NAME, ensure_post_tags, load_authors,
+                       load_post_tags, load_table_meta, load_tag_vocab)
+from tag_hll import AuthorSketch
+from tag_decode import MONTH_ORIGIN
+from tag_vocab import TagVocab
+
+# === CONFIGURATION ===
+TAG_CUBE_DIR = os.path.join(DATA_DIR, "tag_cube")
+
+# === Measures: each one is a dense tags x months .npy, memory-mapped on open ===
+# posts       posts carrying the tag (what every script counts as "posts")
+# questions   posts with PostTypeId 1
+# answers     answers, attributed to the tags of their parent question
+# score       sum of Score over the tag's posts
+# views       sum of ViewCount over the tag's posts
+# answer_count  sum of AnswerCount over the tag's posts
+# authors     distinct OwnerUserIds of the tag's posts (HyperLogLog estimate, not
+#             scaled up for a sample; windows longer than a month: TagCube.authors)
+MEASURES = {
+    "posts": "int32",
+    "questions": "int32",
+    "answers": "int32",
+    "score": "int64",
+    "views": "int64",
+    "answer_count": "int64",
+    "authors": "int32",
+}
+UNSCALED = {"authors"}  # distinct counts do not grow linearly with the sample
+
+
+def tag_cube_dir(sample_fraction=1.0):
+    if sample_fraction >= 1.0:
+        return TAG_CUBE_DIR
+    return f"{TAG_CUBE_DIR}_sample{sample_fraction:g}"
+
+
+def month_positions(timeline):
+    # Month index (months since 2008-01) of every entry of a date_range/period_range
+    if isinstance(timeline, pd.PeriodIndex):
+        timeline = timeline.to_timestamp()
+    timeline = pd.DatetimeIndex(timeline)
+    return ((timeline.year - MONTH_ORIGIN[0]) * 12 + timeline.month - MONTH_ORIGIN[1]).to_numpy()
+
+
+# === Build ===
+def _answer_rows(table):
+    # Expands every answer into one row per tag of its parent question
+    post_type = np.asarray(table["post_type"])
+    is_question = post_type == 1
+    q_post = np.asarray(table["post_id"])[is_question]
+    q_tag = np.asarray(table["tag_id"])[is_question]
+    order = np.argsort(q_post, kind="stable")
+    q_post, q_tag = q_post[order], q_tag[order]
+
+    is_answer = (post_type == 2) & (np.asarray(table["parent_id"]) > 0)
+    # An untagged answer appears once in the table; tagged ones would repeat
+    a_post, first = np.unique(np.asarray(table["post_id"])[is_answer], return_index=True)
+    a_parent = np.asarray(table["parent_id"])[is_answer][first]
+    a_month = np.asarray(table["month_index"])[is_answer][first]
+
+    lo = np.searchsorted(q_post, a_parent, side="left")
+    hi = np.searchsorted(q_post, a_parent, side="right")
+    n_tags = hi - lo
+
+    # Positions lo, lo+1, ..., hi-1 for every answer, without a Python loop
+    starts = np.repeat(lo - np.cumsum(n_tags) + n_tags, n_tags)
+    positions = starts + np.arange(n_tags.sum())
+    return q_tag[positions], np.repeat(a_month, n_tags)
+
+
+def build_cube(table_dir=POST_TAGS_DIR, cube_dir=TAG_CUBE_DIR):
+    os.makedirs(cube_dir, exist_ok=True)
+    table = load_post_tags(table_dir)
+    vocab = load_tag_vocab(table_dir)
+
+    month = np.asarray(table["month_index"]).astype(np.int64)
+    n_tags = len(vocab)
+    n_months = int(month.max()) + 1 if len(month) else 0
+    size = n_tags * n_months
+
+    keep = month >= 0
+    flat = np.asarray(table["tag_id"]).astype(np.int64)[keep] * n_months + month[keep]
+    post_type = np.asarray(table["post_type"])[keep]
+
+    a_tag, a_month = _answer_rows(table)
+    a_keep = a_month >= 0
+    a_flat = a_tag[a_keep].astype(np.int64) * n_months + a_month[a_keep]
+
+    values = {
+        "posts": np.bincount(flat, minlength=size),
+        "questions": np.bincount(flat[post_type == 1], minlength=size),
+        "answers": np.bincount(a_flat, minlength=size),
+        "score": np.bincount(flat, weights=np.asarray(table["score"])[keep], minlength=size),
+        "views": np.bincount(flat, weights=np.asarray(table["views"])[keep], minlength=size),
+        "answer_count": np.bincount(flat, weights=np.asarray(table["answers"])[keep], minlength=size),
+        "authors": load_authors(table_dir).monthly(n_tags, n_months),
+    }
+
+    for measure, dtype in MEASURES.items():
+        out = np.lib.format.open_memmap(os.path.join(cube_dir, f"{measure}.npy"), mode="w+",
+                                        dtype=dtype, shape=(n_tags, n_months))
+        out[:] = np.rint(values[measure]).astype(dtype).reshape(n_tags, n_months)
+        out.flush()
+        del out
+
+    vocab.save(os.path.join(cube_dir, "tag_vocab.json"))
+    shutil.copyfile(os.path.join(table_dir, AUTHORS_NAME), os.path.join(cube_dir, AUTHORS_NAME))
+    meta = {
+        "n_tags": n_tags,
+        "n_months": n_months,
+        "month_origin": "%04d-%02d" % MONTH_ORIGIN,
+        "measures": MEASURES,
+        "sample_fraction": load_table_meta(table_dir)["sample_fraction"],
+    }
+    with open(os.path.join(cube_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"✅ Tag cube {n_tags} tags x {n_months} months written to {cube_dir}")
+    return meta
+
+
+# === Open ===
+class TagCube:
+    def __init__(self, cube_dir=TAG_CUBE_DIR):
+        with open(os.path.join(cube_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.n_tags = self.meta["n_tags"]
+        self.n_months = self.meta["n_months"]
+        self.sample_fraction = self.meta.get("sample_fraction", 1.0)
+        self.vocab = TagVocab.load(os.path.join(cube_dir, "tag_vocab.json"))
+        self.measures = {
+            measure: np.load(os.path.join(cube_dir, f"{measure}.npy"), mmap_mode="r")
+            for measure in self.meta["measures"]
+        }
+        self.cube_dir = cube_dir
+        self._authors = None
+
+    def __getitem__(self, measure):
+        return self.measures[measure]
+
+    @property
+    def months(self):
+        return pd.period_range(self.meta["month_origin"], periods=self.n_months, freq="M")
+
+    def matrix(self, measure="posts", timeline=None, tag_ids=None, scaled=True):
+        # tags x len(timeline) array aligned to any monthly date_range/period_range;
+        # months the cube does not cover are zero. A sampled cube returns counts
+        # scaled up to full-corpus estimates unless `scaled` is False.
+        data = self.measures[measure]
+        if tag_ids is not None:
+            data = data[np.asarray(tag_ids)]
+        if timeline is not None:
+            months = month_positions(timeline)
+            out = np.zeros((data.shape[0], len(months)), dtype=data.dtype)
+            inside = (months >= 0) & (months < self.n_months)
+            out[:, inside] = data[:, months[inside]]
+            data = out
+        if scaled and self.sample_fraction < 1.0 and measure not in UNSCALED:
+            return scale_counts(data, self.sample_fraction)
+        return data
+
+    def authors(self, window=None):
+        # Distinct authors per tag (all tags, by id) over a monthly window or the whole cube
+        if self._authors is None:
+            self._authors = AuthorSketch.load(os.path.join(self.cube_dir, AUTHORS_NAME))
+        if window is None:
+            return self._authors.distinct(self.n_tags)
+        months = month_positions(window)
+        return self._authors.distinct(self.n_tags, months.min(), months.max())
+
+    def frame(self, tags, measure="posts", timeline=None, scaled=True):
+        # months x tags DataFrame for a few tags (names or ids), like the monthly CSVs
+        tag_ids = [t if isinstance(t, (int, np.integer)) else self.vocab.lookup(t) for t in tags]
+        tag_ids = [i for i in tag_ids if i >= 0]
+        timeline = self.months.to_timestamp() if timeline is None else timeline
+        data = self.matrix(measure, timeline, tag_ids, scaled)
+        return pd.DataFrame(data.T, index=timeline, columns=self.vocab.names(tag_ids))
+
+
+def cube_is_current(cube_dir=TAG_CUBE_DIR):
+    # False when the cube is missing or was built before a measure was added
+    if not os.path.exists(os.path.join(cube_dir, "meta.json")):
+        return False
+    with open(os.path.join(cube_dir, "meta.json"), "r", encoding="utf-8") as f:
+        return set(MEASURES) <= set(json.load(f)["measures"])
+
+
+def ensure_cube(table_dir=POST_TAGS_DIR, cube_dir=TAG_CUBE_DIR):
+    if not cube_is_current(cube_dir):
+        build_cube(table_dir, cube_dir)
+    return cube_dir
+
+
+def prepare_cube(sample_fraction=1.0, source=SHARD_DIR):
+    # Post-tag table and cube for the full corpus or a deterministic sample of it;
+    # each sample fraction gets its own table and cube folders
+    table_dir = ensure_post_tags(source, sample_fraction=sample_fraction)
+    return ensure_cube(table_dir, tag_cube_dir(sample_fraction))
+
+
+def open_cube(cube_dir=TAG_CUBE_DIR):
+    return TagCube(cube_dir)
+
+
+# Usage
+if __name__ == "__main__":
+    build_cube(POST_TAGS_DIR, TAG_CUBE_DIR)
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from tag_vocab import UNTAGGED
+
+MONTH_ORIGIN = (2008, 1)  # month_index 0 == 2008-01
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+# === Column access for both dump flavours ===
+def column(posts, name, default=""):
+    # Shards written from Posts.xml use "Tags"/"CreationDate"; xmltodict
+    # exports (see add_time_series_to_enriched_csv.py) use "@Tags"/"@CreationDate"
+    for key in (name, "@" + name):
+        if key in posts.columns:
+            return posts[key]
+    return pd.Series(default, index=posts.index, dtype=object)
+
+
+# === Tags: "|a|b|" or "<a><b>" for a whole batch at once ===
+def decode_tags(tag_strings, vocab, untagged=True):
+    # Returns CSR arrays: tags of post i are tag_ids[indptr[i]:indptr[i + 1]].
+    # Posts without tags get the [untagged] sentinel when `untagged` is set.
+    s = pd.Series(tag_strings, dtype=object).fillna("").astype(str)
+    s = s.str.replace("><", "|", regex=False).str.strip("<>|")
+    if untagged:
+        s = s.mask(s == "", UNTAGGED)
+
+    parts = s.str.split("|", regex=False)
+    post_of_part = np.repeat(np.arange(len(s)), parts.str.len().to_numpy())
+    flat = parts.explode().to_numpy()
+    nonempty = pd.notna(flat) & (flat != "")
+    post_of_part, flat = post_of_part[nonempty], flat[nonempty]
+
+    # Intern each distinct name once, then map the whole batch through a lookup table
+    codes, uniques = pd.factorize(flat)
+
+    # A tag repeated within one post counts once (first occurrence kept, as before)
+    first = ~pd.DataFrame({"post": post_of_part, "code": codes}).duplicated().to_numpy()
+    post_of_part, codes = post_of_part[first], codes[first]
+
+    lut = vocab.intern_many(uniques)
+    tag_ids = lut[codes] if len(codes) else np.empty(0, dtype=np.int32)
+
+    # Row lengths from the parts that survived, so indptr always matches tag_ids
+    indptr = np.zeros(len(s) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(post_of_part, minlength=len(s)), out=indptr[1:])
+    return indptr, tag_ids
+
+
+# === Dates: CreationDate -> month index and milliseconds ===
+def decode_dates(date_strings):
+    # Invalid or missing dates come back as month_index -1 and valid=False,
+    # with no per-post exceptions
+    dates = pd.to_datetime(pd.Series(date_strings, dtype=object), format=DATE_FORMAT, errors="coerce")
+    valid = dates.notna().to_numpy()
+
+    month_index = np.full(len(dates), -1, dtype=np.int64)
+    month_index[valid] = ((dates.dt.year[valid] - MONTH_ORIGIN[0]) * 12
+                          + dates.dt.month[valid] - MONTH_ORIGIN[1]).to_numpy()
+
+    created = np.zeros(len(dates), dtype=np.int64)
+    created[valid] = dates[valid].to_numpy().astype("datetime64[ms]").astype(np.int64)
+    return month_index, created, valid
+
+
+def decode_ints(values, dtype=np.int64):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").fillna(0).to_numpy().astype(dtype)
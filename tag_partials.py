@@ -0,0 +1,224 @@
+import numpy as np
+import pandas as pd
+
+from chunk_runner import WORKERS, chunk_tasks, run_chunks
+from post_scan import POST_TAGS_DIR, iter_task_batches, decode_posts, load_post_tags
+from tag_decode import MONTH_ORIGIN
+from tag_sketch import sketch_keys, remap_keys, key_tags, merge_sparse, sketch_quantiles
+from tag_vocab import TagVocab
+
+MONTH_BITS = 16  # histogram key = tag_id << 16 | month_index
+NO_DATE_MIN = np.iinfo(np.int64).max
+NO_DATE_MAX = np.iinfo(np.int64).min
+TABLE_BLOCK_ROWS = 5_000_000  # post-tag rows read from the table per reduction step
+
+
+# === Mergeable per-tag partial state ===
+# Every field is an array aligned with `tag_ids` (sorted, unique); the monthly
+# histogram and the per-measure quantile sketches are kept sparse as (key, count)
+# pairs. `m2` holds each measure's sum of squared deviations from the tag mean
+# (Welford), merged with Chan's parallel update. Partials from any split of the
+# posts merge into the state a single pass would have produced.
+class TagPartial:
+    SUMS = ("count", "score", "views", "answers")
+    MEASURES = ("score", "views", "answers")
+
+    def __init__(self, tag_ids, count, score, views, answers, first, last, hist_keys, hist_counts, m2, sketches):
+        self.tag_ids = tag_ids
+        self.count = count
+        self.score = score
+        self.views = views
+        self.answers = answers
+        self.first = first  # earliest CreationDate, ms since 1970
+        self.last = last    # latest CreationDate, ms since 1970
+        self.hist_keys = hist_keys
+        self.hist_counts = hist_counts
+        self.m2 = m2              # {measure: float64 array}
+        self.sketches = sketches  # {measure: (sketch keys, counts)}
+
+    def __len__(self):
+        return len(self.tag_ids)
+
+    @classmethod
+    def empty(cls):
+        ints = np.empty(0, dtype=np.int64)
+        return cls(np.empty(0, dtype=np.int32), ints, ints, ints, ints, ints, ints, ints, ints,
+                   {m: np.empty(0) for m in cls.MEASURES}, {m: (ints, ints) for m in cls.MEASURES})
+
+    @classmethod
+    def from_rows(cls, tag_id, month_index, created, score, views, answers):
+        # Segment reductions over post-tag rows; rows with month_index < 0 are ignored
+        keep = np.asarray(month_index) >= 0
+        tag_id = np.asarray(tag_id)[keep]
+        month_index = np.asarray(month_index)[keep].astype(np.int64)
+        created = np.asarray(created)[keep].astype(np.int64)
+        values = {"score": np.asarray(score)[keep].astype(np.int64),
+                  "views": np.asarray(views)[keep].astype(np.int64),
+                  "answers": np.asarray(answers)[keep].astype(np.int64)}
+
+        tag_ids, inv = np.unique(tag_id, return_inverse=True)
+        n = len(tag_ids)
+        count = np.bincount(inv, minlength=n).astype(np.int64)
+
+        sums, m2, sketches = {}, {}, {}
+        for measure, x in values.items():
+            sums[measure] = np.zeros(n, dtype=np.int64)
+            np.add.at(sums[measure], inv, x)
+            deviation = x - (sums[measure] / np.maximum(count, 1))[inv]
+            m2[measure] = np.bincount(inv, weights=deviation * deviation, minlength=n)
+            keys, counts = np.unique(sketch_keys(tag_id, x), return_counts=True)
+            sketches[measure] = (keys, counts.astype(np.int64))
+
+        first = np.full(n, NO_DATE_MIN, dtype=np.int64)
+        last = np.full(n, NO_DATE_MAX, dtype=np.int64)
+        np.minimum.at(first, inv, created)
+        np.maximum.at(last, inv, created)
+
+        keys = (tag_id.astype(np.int64) << MONTH_BITS) | month_index
+        hist_keys, hist_counts = np.unique(keys, return_counts=True)
+
+        return cls(tag_ids.astype(np.int32), count, sums["score"], sums["views"], sums["answers"],
+                   first, last, hist_keys, hist_counts.astype(np.int64), m2, sketches)
+
+    def remap(self, lut):
+        # Translate chunk-local tag ids to global ones (lut[local_id] == global_id)
+        lut = np.asarray(lut, dtype=np.int64)
+        hist_tags = lut[self.hist_keys >> MONTH_BITS]
+        hist_keys = (hist_tags << MONTH_BITS) | (self.hist_keys & ((1 << MONTH_BITS) - 1))
+        sketches = {m: (remap_keys(keys, lut), counts) for m, (keys, counts) in self.sketches.items()}
+        remapped = TagPartial(lut[self.tag_ids], self.count, self.score, self.views, self.answers,
+                              self.first, self.last, hist_keys, self.hist_counts, self.m2, sketches)
+        return TagPartial.merge([remapped])  # re-sort, and fold ids that collapsed together
+
+    @classmethod
+    def merge(cls, partials):
+        partials = [p for p in partials if len(p)]
+        if not partials:
+            return cls.empty()
+
+        tag_ids, inv = np.unique(np.concatenate([p.tag_ids for p in partials]), return_inverse=True)
+        n = len(tag_ids)
+
+        sums = {}
+        for field in cls.SUMS:
+            out = np.zeros(n, dtype=np.int64)
+            np.add.at(out, inv, np.concatenate([getattr(p, field) for p in partials]))
+            sums[field] = out
+
+        # Chan et al.: M2 = sum(M2_i + n_i * (mean_i - mean)^2)
+        count = np.concatenate([p.count for p in partials])
+        m2, sketches = {}, {}
+        for measure in cls.MEASURES:
+            part_mean = np.concatenate([getattr(p, measure) for p in partials]) / count
+            shift = part_mean - (sums[measure] / sums["count"])[inv]
+            m2[measure] = np.zeros(n)
+            np.add.at(m2[measure], inv, np.concatenate([p.m2[measure] for p in partials]) + count * shift * shift)
+            sketches[measure] = merge_sparse([p.sketches[measure][0] for p in partials],
+                                             [p.sketches[measure][1] for p in partials])
+
+        first = np.full(n, NO_DATE_MIN, dtype=np.int64)
+        last = np.full(n, NO_DATE_MAX, dtype=np.int64)
+        np.minimum.at(first, inv, np.concatenate([p.first for p in partials]))
+        np.maximum.at(last, inv, np.concatenate([p.last for p in partials]))
+
+        hist_keys, hist_counts = merge_sparse([p.hist_keys for p in partials], [p.hist_counts for p in partials])
+
+        return cls(tag_ids.astype(np.int32), sums["count"], sums["score"], sums["views"], sums["answers"],
+                   first, last, hist_keys, hist_counts, m2, sketches)
+
+    def drop(self, tag_id):
+        keep = self.tag_ids != tag_id
+        hist_keep = (self.hist_keys >> MONTH_BITS) != tag_id
+        sketches = {m: (keys[key_tags(keys) != tag_id], counts[key_tags(keys) != tag_id])
+                    for m, (keys, counts) in self.sketches.items()}
+        return TagPartial(self.tag_ids[keep], self.count[keep], self.score[keep], self.views[keep],
+                          self.answers[keep], self.first[keep], self.last[keep],
+                          self.hist_keys[hist_keep], self.hist_counts[hist_keep],
+                          {m: v[keep] for m, v in self.m2.items()}, sketches)
+
+    def std(self, measure):
+        # Sample standard deviation (ddof=1, like pandas); NaN for single-post tags
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 1, np.sqrt(self.m2[measure] / (self.count - 1)), np.nan)
+
+    def quantile(self, measure, q):
+        keys, counts = self.sketches[measure]
+        return sketch_quantiles(keys, counts, self.tag_ids, q)
+
+    def peak_month(self):
+        # Month index with the most posts per tag (earliest month on ties)
+        hist_tags = self.hist_keys >> MONTH_BITS
+        months = self.hist_keys & ((1 << MONTH_BITS) - 1)
+        order = np.lexsort((months, -self.hist_counts, hist_tags))
+        hist_tags = hist_tags[order]
+        is_first = np.r_[True, hist_tags[1:] != hist_tags[:-1]]
+        return months[order][is_first]  # one entry per tag, aligned with tag_ids
+
+
+# === Parallel scan: one partial per chunk task, merged in task order ===
+def tag_partial_task(job):
+    task, casefold = job
+    vocab = TagVocab(casefold=casefold)  # chunk-local ids, mapped to global ids in the reduce step
+    partials = []
+    for posts in iter_task_batches(task):
+        rows, _ = decode_posts(posts, vocab)
+        partials.append(TagPartial.from_rows(rows["tag_id"], rows["month_index"], rows["created"],
+                                             rows["score"], rows["views"], rows["answers"]))
+    return TagPartial.merge(partials), list(vocab.names())
+
+
+def scan_tag_partials(source, vocab, workers=WORKERS):
+    # Tag-month counts, lifespan min/max and sums for every tag in `source`,
+    # keyed by ids of `vocab` (new tags are interned into it)
+    def combine(acc, result):
+        partial, names = result
+        return TagPartial.merge([acc, partial.remap(vocab.intern_many(names))])
+
+    jobs = [(task, vocab.casefold) for task in chunk_tasks(source, workers)]
+    return run_chunks(tag_partial_task, jobs, combine, TagPartial.empty(), workers)
+
+
+def table_partial(table_dir=POST_TAGS_DIR, block_rows=TABLE_BLOCK_ROWS):
+    # The same state from an existing post-tag table, one block of rows at a time,
+    # so memory follows the number of tags rather than the number of posts
+    table = load_post_tags(table_dir, columns=["tag_id", "month_index", "created", "score", "views", "answers"])
+    acc = TagPartial.empty()
+    for start in range(0, len(table["tag_id"]), block_rows):
+        block = {name: np.asarray(values[start:start + block_rows]) for name, values in table.items()}
+        acc = TagPartial.merge([acc, TagPartial.from_rows(block["tag_id"], block["month_index"], block["created"],
+                                                          block["score"], block["views"], block["answers"])])
+    return acc
+
+
+# === Skill biology summary from a merged partial ===
+def biology_summary(partial, vocab, sample_fraction=1.0):
+    # Total Posts is scaled up to a full-corpus estimate for a sampled table
+    count = partial.count
+    total_posts = count / sample_fraction if sample_fraction < 1.0 else count
+    birth = pd.to_datetime(partial.first, unit="ms")
+    last_seen = pd.to_datetime(partial.last, unit="ms")
+    peak = partial.peak_month() + MONTH_ORIGIN[1] - 1
+    peak = pd.Series(MONTH_ORIGIN[0] + peak // 12).astype(str) + "-" + pd.Series(peak % 12 + 1).astype(str).str.zfill(2)
+
+    return pd.DataFrame({
+        "Skill": vocab.names(partial.tag_ids),
+        "Date of Birth": birth,
+        "Peak Activity Date": peak,
+        "Avg Views": np.round(partial.views / count, 2),
+        "Avg Score": np.round(partial.score / count, 2),
+        "Avg Answers": np.round(partial.answers / count, 2),
+        "Total Posts": total_posts,
+        "Immunity Score": np.where((total_posts > 1000) & (last_seen.year > 2022), "High", "Low"),
+    })
+
+
+def distribution_summary(partial):
+    # Spread of each measure per tag: std from Welford's M2, median/p90/p99 from
+    # the quantile sketches (within 1% of a true value, snapped to whole numbers
+    # since every measure is an integer); aligned with biology_summary
+    columns = {}
+    for measure, label in (("views", "Views"), ("score", "Score"), ("answers", "Answers")):
+        columns[f"Std {label}"] = np.round(partial.std(measure), 2)
+        for q, name in ((0.5, "Median"), (0.9, "P90"), (0.99, "P99")):
+            columns[f"{name} {label}"] = np.rint(partial.quantile(measure, q)).astype(np.int64)
+    return pd.DataFrame(columns)
@@ -0,0 +1,66 @@
+import numpy as np
+
+# === Mergeable per-tag quantile sketch (DDSketch-style log buckets) ===
+# A value x > 0 goes to bucket ceil(log_gamma(x)), negative values mirror it and
+# zero has its own bucket. Every bucket spans a fixed ratio, so any quantile read
+# back from the counts is within RELATIVE_ACCURACY of a true sample value. The
+# sketch is a sparse (key, count) list like the monthly histogram in TagPartial:
+# merging is concatenate + sum per key, and a tag never needs more buckets than
+# the value range allows (~1,100 for a positive int32 at 1%).
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+BUCKET_BITS = 32  # sketch key = tag_id << 32 | (bucket + 2^31)
+BUCKET_OFFSET = 1 << (BUCKET_BITS - 1)
+BUCKET_MASK = (1 << BUCKET_BITS) - 1
+
+
+def bucket_index(values):
+    v = np.asarray(values, dtype=np.float64)
+    mag = np.abs(v)
+    out = np.zeros(len(v), dtype=np.int64)
+    nonzero = mag > 0
+    out[nonzero] = np.maximum(np.ceil(np.log(mag[nonzero]) / LOG_GAMMA), 0).astype(np.int64) + 1
+    return np.where(v < 0, -out, out)
+
+
+def bucket_value(index):
+    # Representative value of a bucket: relative error <= RELATIVE_ACCURACY
+    index = np.asarray(index, dtype=np.int64)
+    mag = 2 * GAMMA ** (np.abs(index) - 1).astype(np.float64) / (GAMMA + 1)
+    return np.where(index == 0, 0.0, np.sign(index) * mag)
+
+
+def sketch_keys(tag_id, values):
+    return (np.asarray(tag_id, dtype=np.int64) << BUCKET_BITS) | (bucket_index(values) + BUCKET_OFFSET)
+
+
+def key_tags(keys):
+    return keys >> BUCKET_BITS
+
+
+def remap_keys(keys, lut):
+    return (np.asarray(lut, dtype=np.int64)[key_tags(keys)] << BUCKET_BITS) | (keys & BUCKET_MASK)
+
+
+def merge_sparse(keys, counts):
+    # Sum counts per key over concatenated (key, count) lists; keys come back sorted
+    keys, inv = np.unique(np.concatenate(keys), return_inverse=True)
+    out = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(out, inv, np.concatenate(counts))
+    return keys, out
+
+
+# === Quantiles for every tag at once ===
+def sketch_quantiles(keys, counts, tag_ids, q):
+    # Value at rank floor(q * (n - 1)) of each tag in `tag_ids` (sorted, all
+    # present in the sketch); `keys` must be sorted, as merge_sparse returns them
+    cum = np.cumsum(counts)
+    tags = key_tags(keys)
+    lo = np.searchsorted(tags, tag_ids, side="left")
+    hi = np.searchsorted(tags, tag_ids, side="right")
+    before = np.where(lo > 0, cum[np.maximum(lo - 1, 0)], 0)
+    n = cum[hi - 1] - before
+    rank = np.floor(q * (n - 1)).astype(np.int64)
+    pos = np.searchsorted(cum, before + rank, side="right")
+    return bucket_value((keys[pos] & BUCKET_MASK) - BUCKET_OFFSET)
@@ -0,0 +1,78 @@
+import os
+import json
+import numpy as np
+
+# === CONFIGURATION ===
+DATA_DIR = "C:/Users/makri/Desktop/SKILL AGEING"
+TAG_VOCAB_PATH = os.path.join(DATA_DIR, "tag_vocab.json")
+
+UNTAGGED = "[untagged]"
+UNTAGGED_ID = 0  # id 0 is always the sentinel for posts without tags
+
+
+# === Persistent tag <-> int32 id mapping ===
+# Ids are handed out in first-seen order and never reused, so a vocabulary
+# that is loaded, extended and saved keeps every existing id stable.
+class TagVocab:
+    def __init__(self, tags=(), casefold=True):
+        self.casefold = casefold
+        self._names = [UNTAGGED]
+        self._ids = {UNTAGGED: UNTAGGED_ID}
+        for tag in tags:
+            self.intern(tag)
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, tag):
+        return self.normalize(tag) in self._ids
+
+    def normalize(self, tag):
+        tag = tag.strip()
+        return tag.casefold() if self.casefold else tag
+
+    def intern(self, tag):
+        tag = self.normalize(tag)
+        tag_id = self._ids.get(tag)
+        if tag_id is None:
+            tag_id = self._ids[tag] = len(self._names)
+            self._names.append(tag)
+        return tag_id
+
+    def lookup(self, tag, default=-1):
+        return self._ids.get(self.normalize(tag), default)
+
+    def intern_many(self, tags):
+        return np.array([self.intern(t) for t in tags], dtype=np.int32)
+
+    def lookup_many(self, tags, default=-1):
+        return np.array([self.lookup(t, default) for t in tags], dtype=np.int32)
+
+    def name(self, tag_id):
+        return self._names[tag_id]
+
+    def names(self, tag_ids=None):
+        # Resolve ids to names at output time; returns an object array
+        names = np.array(self._names, dtype=object)
+        return names if tag_ids is None else names[np.asarray(tag_ids)]
+
+    # === Persistence ===
+    def save(self, path=TAG_VOCAB_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"casefold": self.casefold, "tags": self._names[1:]}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TAG_VOCAB_PATH, casefold=True):
+        # A missing file gives a fresh vocabulary that only holds the sentinel
+        if not os.path.exists(path):
+            return cls(casefold=casefold)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        vocab = cls(casefold=data["casefold"])
+        # Stored names are already normalized; keep their ids exactly
+        for tag in data["tags"]:
+            vocab._ids[tag] = len(vocab._names)
+            vocab._names.append(tag)
+        return vocab
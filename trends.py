@@ -0,0 +1,125 @@
+import os
+import zlib
+import numpy as np
+import pandas as pd
+
+from tag_cube import month_positions
+
+PAIR_BATCH = 100_000  # pairs fitted per step in pair_ols
+
+
+# === Closed-form OLS of every row against time, in one pass ===
+# slope = (n Sxy - Sx Sy) / (n Sxx - Sx^2), intercept = (Sy - slope Sx) / n and
+# R^2 is the squared correlation. For integer counts every sum is exact in
+# float64, so the slopes match LinearRegression().fit(arange(len(ts)), ts).
+def _fit(n, sx, sy, sxx, sxy, syy):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        cov = n * sxy - sx * sy
+        slope = np.where(var_x > 0, cov / var_x, np.nan)
+        intercept = np.where(n > 0, (sy - np.nan_to_num(slope) * sx) / n, np.nan)
+        r2 = np.where((var_x > 0) & (var_y > 0), cov * cov / (var_x * var_y), np.where(var_x > 0, 1.0, np.nan))
+    return {"slope": slope, "intercept": intercept, "r2": r2, "n": n.astype(np.int64)}
+
+
+def ols_fit(y, mask=None):
+    # Fits along the last axis. With a mask, the kept months are laid end to end
+    # (x = 0, 1, ... over the masked months), as get_slope(ts[mask]) did.
+    y = np.asarray(y, dtype=np.float64)
+    if mask is None:
+        mask = np.ones(y.shape, dtype=bool)
+    w = np.asarray(mask, dtype=np.float64)
+    x = (np.cumsum(w, axis=-1) - 1) * w
+    y = y * w
+    return _fit(w.sum(axis=-1), x.sum(axis=-1), y.sum(axis=-1),
+                (x * x).sum(axis=-1), (x * y).sum(axis=-1), (y * y).sum(axis=-1))
+
+
+def rolling_ols(y, window):
+    # Fit of every `window`-month stretch of every row (x = 0..window-1 in each),
+    # from prefix sums: result arrays are rows x (months - window + 1)
+    y = np.asarray(y, dtype=np.float64)
+    t = np.arange(y.shape[-1], dtype=np.float64)
+    p_y = np.concatenate([np.zeros(y.shape[:-1] + (1,)), np.cumsum(y, axis=-1)], axis=-1)
+    p_ty = np.concatenate([np.zeros(y.shape[:-1] + (1,)), np.cumsum(t * y, axis=-1)], axis=-1)
+    p_yy = np.concatenate([np.zeros(y.shape[:-1] + (1,)), np.cumsum(y * y, axis=-1)], axis=-1)
+
+    start = np.arange(y.shape[-1] - window + 1, dtype=np.float64)
+    s = start.astype(np.int64)
+    sy = p_y[..., s + window] - p_y[..., s]
+    sxy = p_ty[..., s + window] - p_ty[..., s] - start * sy  # shift x to start at 0
+    syy = p_yy[..., s + window] - p_yy[..., s]
+    n = np.full(sy.shape, float(window))
+    sx = np.full(sy.shape, window * (window - 1) / 2)
+    sxx = np.full(sy.shape, (window - 1) * window * (2 * window - 1) / 6)
+    return _fit(n, sx, sy, sxx, sxy, syy)
+
+
+def pair_ols(y, i, j, batch=PAIR_BATCH):
+    # Slopes of rows i and j over the months where both are active, for many
+    # pairs at once: returns fits for each side plus the overlap length
+    y = np.asarray(y, dtype=np.float64)
+    i, j = np.asarray(i), np.asarray(j)
+    parts = []
+    for lo in range(0, len(i), batch):
+        a, b = y[i[lo:lo + batch]], y[j[lo:lo + batch]]
+        mask = (a > 0) & (b > 0)
+        parts.append((ols_fit(a, mask), ols_fit(b, mask)))
+    if not parts:
+        empty = ols_fit(np.zeros((0, y.shape[-1])))
+        return empty, empty
+    join = lambda fits: {key: np.concatenate([f[key] for f in fits]) for key in fits[0]}
+    return join([p[0] for p in parts]), join([p[1] for p in parts])
+
+
+def pair_matrix(y):
+    # All pairs of rows: slope[a, b] is row a's slope over the months where both
+    # a and b are active, overlap[a, b] the number of those months
+    k = len(y)
+    i, j = np.triu_indices(k, 1)
+    fit_i, fit_j = pair_ols(y, i, j)
+    slope = np.full((k, k), np.nan)
+    slope[i, j], slope[j, i] = fit_i["slope"], fit_j["slope"]
+    overlap = np.zeros((k, k), dtype=np.int64)
+    overlap[i, j] = overlap[j, i] = fit_i["n"]
+    return slope, overlap
+
+
+# === Cached per-tag trends over a cube timeline ===
+def _is_fresh(path, cube):
+    # A cache file is only used when written after the cube (rebuilt after a
+    # rescan, a new sample or a monthly refresh)
+    meta = os.path.join(cube.cube_dir, "meta.json")
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(meta)
+
+
+def tag_trends(cube, timeline, measure="posts"):
+    # slope/intercept/r2 per tag id over `timeline`, cached next to the cube so
+    # every later caller (dashboard, top-100 analysis) only loads it
+    months = month_positions(timeline)
+    path = os.path.join(cube.cube_dir, f"trends_{measure}_{months.min()}_{months.max()}.npz")
+    if _is_fresh(path, cube):
+        with np.load(path) as cached:
+            if len(cached["slope"]) == cube.n_tags:
+                return pd.DataFrame({key: cached[key] for key in cached.files})
+
+    fit = ols_fit(cube.matrix(measure, timeline))
+    np.savez(path, **fit)
+    return pd.DataFrame(fit)
+
+
+def pair_trends(cube, tag_ids, timeline, measure="posts"):
+    # pair_matrix over a set of tags (e.g. the top 100), cached like tag_trends
+    tag_ids = np.asarray(tag_ids, dtype=np.int64)
+    months = month_positions(timeline)
+    key = zlib.crc32(tag_ids.tobytes())
+    path = os.path.join(cube.cube_dir, f"pair_trends_{measure}_{months.min()}_{months.max()}_{key:08x}.npz")
+    if _is_fresh(path, cube):
+        with np.load(path) as cached:
+            if np.array_equal(cached["tag_ids"], tag_ids):
+                return cached["slope"], cached["overlap"]
+
+    slope, overlap = pair_matrix(cube.matrix(measure, timeline, tag_ids))
+    np.savez(path, tag_ids=tag_ids, slope=slope, overlap=overlap)
+    return slope, overlap